@@ -0,0 +1,67 @@
+"""
+Benchmark model-input image size and preprocessing latency.
+
+Runs every screenshot in a folder through a set of ImageConfig presets and
+reports the average encoded payload size and preprocessing time.
+
+Usage:
+    python benchmarks/bench_image_pipeline.py [--dir screenshots/] [--repeat 3]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bench_screenshot import make_fixture
+
+from phone_agent.adb.screenshot import _parse_png_screencap
+from phone_agent.model.image import ImageConfig, preprocess_image
+
+PRESETS = {
+    "png (passthrough)": ImageConfig(),
+    "png 1280": ImageConfig(max_side=1280),
+    "jpeg 1280 q85": ImageConfig(max_side=1280, format="JPEG", quality=85),
+    "jpeg 960 q75": ImageConfig(max_side=960, format="JPEG", quality=75),
+    "webp 1280 q80": ImageConfig(max_side=1280, format="WEBP", quality=80),
+    "jpeg 1280 q85 gray": ImageConfig(
+        max_side=1280, format="JPEG", quality=85, grayscale=True
+    ),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dir", type=Path, help="Folder of PNG screenshots")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.dir:
+        samples = [path.read_bytes() for path in sorted(args.dir.glob("*.png"))]
+    else:
+        samples = [make_fixture()]
+    if not samples:
+        sys.exit(f"No PNG files found in {args.dir}")
+    print(f"{len(samples)} screenshot(s), {args.repeat} repeat(s)\n")
+
+    print(f"{'preset':<22}{'avg KB':>10}{'avg ms':>10}")
+    for name, config in PRESETS.items():
+        total_bytes = 0
+        elapsed = 0.0
+        for _ in range(args.repeat):
+            for data in samples:
+                # Fresh Screenshot each run so cached encodings are not reused
+                screenshot = _parse_png_screencap(data)
+                start = time.perf_counter()
+                image_base64, _ = preprocess_image(screenshot, config)
+                elapsed += time.perf_counter() - start
+                total_bytes += len(image_base64)
+        runs = args.repeat * len(samples)
+        avg_kb = total_bytes / runs / 1024
+        print(f"{name:<22}{avg_kb:>10.1f}{elapsed / runs * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark Annex-B NAL splitting throughput in MB/s.
+
+Feeds an H.264 Annex-B stream to the splitter in 64KB chunks, the size
+_stream_loop reads from the scrcpy socket, and compares the previous
+find-and-reslice loop with AnnexBSplitter. Without --dump a synthetic
+stream is used: 30-frame GOPs with a large IDR frame, so NAL units span
+many chunks.
+
+Record a raw dump from a device with:
+    adb exec-out screenrecord --output-format=h264 --time-limit 10 - > dump.h264
+
+Usage:
+    python benchmarks/bench_nal_splitter.py [--dump dump.h264] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "python-service"))
+
+from nal_stream import AnnexBSplitter
+
+CHUNK_SIZE = 65536
+
+
+def make_stream(gops: int = 10, idr_size: int = 512 * 1024) -> bytes:
+    """Synthetic Annex-B stream of SPS, PPS, IDR and 29 P frames per GOP."""
+
+    def nal(header: int, size: int) -> bytes:
+        # Payload without zero bytes, so it contains no start codes
+        payload = os.urandom(size).replace(b"\x00", b"\x01")
+        return b"\x00\x00\x00\x01" + bytes([header]) + payload
+
+    parts = []
+    for _ in range(gops):
+        parts += [nal(0x67, 16), nal(0x68, 4), nal(0x65, idr_size)]
+        parts += [nal(0x41, 16 * 1024) for _ in range(29)]
+    return b"".join(parts)
+
+
+def split_legacy(stream: bytes) -> int:
+    """The previous _stream_loop splitting; returns the number of NAL units."""
+    count = 0
+    buffer = bytearray()
+    for offset in range(0, len(stream), CHUNK_SIZE):
+        buffer.extend(stream[offset : offset + CHUNK_SIZE])
+        while True:
+            code_4 = buffer.find(b"\x00\x00\x00\x01")
+            code_3 = buffer.find(b"\x00\x00\x01")
+            if code_4 == -1 and code_3 == -1:
+                break
+            if code_3 != -1 and (code_4 == -1 or code_3 < code_4):
+                start_pos, start_code_len = code_3, 3
+            else:
+                start_pos, start_code_len = code_4, 4
+            next_4 = buffer.find(b"\x00\x00\x00\x01", start_pos + start_code_len)
+            next_3 = buffer.find(b"\x00\x00\x01", start_pos + start_code_len)
+            if next_4 == -1 and next_3 == -1:
+                break
+            end_pos = min(p for p in (next_4, next_3) if p != -1)
+            bytes(buffer[start_pos:end_pos])
+            count += 1
+            buffer = buffer[end_pos:]
+    return count
+
+
+def split_incremental(stream: bytes) -> int:
+    """AnnexBSplitter, copying each unit like _stream_loop does."""
+    count = 0
+    splitter = AnnexBSplitter()
+    for offset in range(0, len(stream), CHUNK_SIZE):
+        for nal_view in splitter.feed(stream[offset : offset + CHUNK_SIZE]):
+            bytes(nal_view)
+            nal_view.release()
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--dump", help="Raw H.264 Annex-B file")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.dump:
+        stream = Path(args.dump).read_bytes()
+        source = args.dump
+    else:
+        stream = make_stream()
+        source = "synthetic"
+    megabytes = len(stream) / 1e6
+    print(f"Stream: {source}, {megabytes:.1f} MB, {CHUNK_SIZE // 1024}KB chunks\n")
+
+    for name, split in (("legacy", split_legacy), ("incremental", split_incremental)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            count = split(stream)
+            best = min(best, time.perf_counter() - start)
+        print(
+            f"{name:12s} {megabytes / best:8.1f} MB/s  "
+            f"({count} NAL units, {best * 1000:.1f} ms)"
+        )
+
+
+if __name__ == "__main__":
+    main()
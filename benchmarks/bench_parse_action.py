@@ -0,0 +1,98 @@
+"""
+Benchmark parse_action against the previous eval-based parser.
+
+Parses a corpus of model outputs (one action per line, or the built-in
+sample of typical AutoGLM outputs) with both parsers, checks that they
+agree wherever eval succeeds, and reports the time per call.
+
+Usage:
+    python benchmarks/bench_parse_action.py [--corpus actions.txt]
+        [--repeat 2000]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from phone_agent.actions.handler import do, parse_action
+
+SAMPLE_CORPUS = [
+    'do(action="Launch", app="微信")',
+    'do(action="Tap", element=[523, 871])',
+    'do(action="Tap", element=[88, 1932], message="点击确认支付")',
+    'do(action="Type", text="明天下午三点的会议改到四点")',
+    'do(action="Type", text="He said \\"ok\\"\\nThanks")',
+    'do(action="Swipe", start=[540, 1800], end=[540, 600])',
+    'do(action="Long Press", element=[300, 450])',
+    'do(action="Double Tap", element=[512, 1024])',
+    'do(action="Back")',
+    'do(action="Home")',
+    'do(action="Wait", duration="2 seconds")',
+    'do(action="Take_over", message="请完成登录验证")',
+    'finish(message="已为你在美团下单一杯拿铁，预计30分钟送达。")',
+    'finish(message="任务完成")',
+]
+
+
+def legacy_parse_action(response: str) -> dict:
+    """parse_action as it was before the safe parser, for comparison."""
+    response = response.strip()
+    if response.startswith("do"):
+        return eval(response, {"do": do})
+    if response.startswith("finish"):
+        return {
+            "_metadata": "finish",
+            "message": response.replace("finish(message=", "")[1:-2],
+        }
+    raise ValueError(f"Failed to parse action: {response}")
+
+
+def measure(fn, corpus: list[str], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in corpus:
+            try:
+                fn(text)
+            except Exception:
+                pass
+    return (time.perf_counter() - start) / (repeat * len(corpus))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", type=Path, help="File with one action per line")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpus = [
+            line.strip()
+            for line in args.corpus.read_text(encoding="utf-8").splitlines()
+            if line.strip()
+        ]
+    else:
+        corpus = SAMPLE_CORPUS
+
+    mismatches = 0
+    for text in corpus:
+        try:
+            expected = legacy_parse_action(text)
+        except Exception:
+            continue
+        if parse_action(text) != expected:
+            mismatches += 1
+            print(f"mismatch: {text}")
+    print(f"{len(corpus)} actions, {mismatches} mismatch(es)\n")
+
+    legacy = measure(legacy_parse_action, corpus, args.repeat)
+    current = measure(parse_action, corpus, args.repeat)
+    print(f"{'eval (legacy)':<16}{legacy * 1e6:>8.1f} us/call")
+    print(f"{'parse_action':<16}{current * 1e6:>8.1f} us/call")
+    print(f"speedup: {legacy / current:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
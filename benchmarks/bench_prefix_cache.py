@@ -0,0 +1,101 @@
+"""
+Benchmark prefix-cache reuse of the agent's prompt layout on a live server.
+
+Replays a multi-step conversation against an OpenAI-compatible server
+(e.g. vLLM with --enable-prefix-caching --enable-prompt-tokens-details)
+twice: once with the default layout, which strips the screenshot from the
+previous user message every step, and once append-only as used with
+AgentConfig(prefix_cache=True). Reports prompt/cached tokens per step.
+
+Usage:
+    python benchmarks/bench_prefix_cache.py [--base-url URL] [--model NAME]
+        [--steps 6]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bench_screenshot import make_fixture
+
+from phone_agent.adb.screenshot import _parse_png_screencap
+from phone_agent.config import get_system_prompt
+from phone_agent.model import ModelClient, ModelConfig
+from phone_agent.model.client import MessageBuilder
+from phone_agent.model.image import preprocess_image
+
+TASK = "打开设置，查看关于手机"
+
+
+def run_layout(client: ModelClient, steps: int, append_only: bool) -> None:
+    image_base64, mime_type = preprocess_image(
+        _parse_png_screencap(make_fixture()), client.config.image
+    )
+    context = [MessageBuilder.create_system_message(get_system_prompt("cn"))]
+    total_prompt = total_cached = 0
+
+    print(f"{'step':>4}{'prompt':>10}{'cached':>10}{'hit %':>8}{'ms':>9}")
+    for step in range(1, steps + 1):
+        screen_info = MessageBuilder.build_screen_info("System Home")
+        if step == 1:
+            text = f"{TASK}\n\n{screen_info}"
+        else:
+            text = f"** Screen Info **\n\n{screen_info}"
+        context.append(
+            MessageBuilder.create_user_message(text, image_base64, mime_type)
+        )
+
+        start = time.perf_counter()
+        response = client.request(context)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        usage = response.usage
+        if usage is None:
+            sys.exit("Server did not report usage")
+        total_prompt += usage.prompt_tokens
+        total_cached += usage.cached_tokens
+        print(
+            f"{step:>4}{usage.prompt_tokens:>10}{usage.cached_tokens:>10}"
+            f"{usage.cache_hit_rate * 100:>8.1f}{elapsed:>9.0f}"
+        )
+
+        if not append_only:
+            context[-1] = MessageBuilder.remove_images_from_message(context[-1])
+        context.append(
+            MessageBuilder.create_assistant_message(
+                f"<think>{response.thinking}</think><answer>{response.action}</answer>"
+            )
+        )
+
+    rate = total_cached / total_prompt * 100 if total_prompt else 0.0
+    print(f"total: {total_prompt} prompt tokens, {total_cached} cached ({rate:.1f}%)\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://localhost:8000/v1")
+    parser.add_argument("--model", default="autoglm-phone-9b")
+    parser.add_argument("--apikey", default="EMPTY")
+    parser.add_argument("--steps", type=int, default=6)
+    args = parser.parse_args()
+
+    client = ModelClient(
+        ModelConfig(
+            base_url=args.base_url,
+            api_key=args.apikey,
+            model_name=args.model,
+            max_tokens=256,
+        )
+    )
+
+    print("== strip images (default) ==")
+    run_layout(client, args.steps, append_only=False)
+    print("== append-only (prefix_cache=True) ==")
+    run_layout(client, args.steps, append_only=True)
+
+
+if __name__ == "__main__":
+    main()
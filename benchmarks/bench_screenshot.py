@@ -0,0 +1,74 @@
+"""
+Benchmark per-step CPU cost of turning a `screencap -p` PNG into a Screenshot.
+
+Compares the legacy path (decode with PIL, re-encode to PNG, base64) with
+the pass-through path used by get_screenshot today.
+
+Usage:
+    python benchmarks/bench_screenshot.py [--image fixture.png] [--steps 20]
+"""
+
+import argparse
+import base64
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from PIL import Image
+
+from phone_agent.adb.screenshot import _parse_png_screencap
+
+
+def make_fixture(width: int = 1080, height: int = 2400) -> bytes:
+    """Generate a screenshot-like PNG: flat panels, text-like noise rows."""
+    rng = np.random.default_rng(0)
+    pixels = np.full((height, width, 3), 245, dtype=np.uint8)
+    for top in range(0, height - 180, 180):
+        pixels[top : top + 160, 40:-40] = rng.integers(200, 255, 3)
+        rows = rng.integers(0, 2, (24, width - 160), dtype=np.uint8) * 200
+        pixels[top + 60 : top + 84, 80:-80] = rows[..., None]
+    buffered = BytesIO()
+    Image.fromarray(pixels, "RGB").save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+def legacy_step(data: bytes) -> str:
+    img = Image.open(BytesIO(data))
+    buffered = BytesIO()
+    img.save(buffered, format="PNG")
+    return base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+
+def passthrough_step(data: bytes) -> str:
+    return _parse_png_screencap(data).base64_data
+
+
+def measure(fn, data: bytes, steps: int) -> float:
+    start = time.process_time()
+    for _ in range(steps):
+        fn(data)
+    return (time.process_time() - start) / steps * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--image", type=Path, help="PNG fixture (default: synthetic)")
+    parser.add_argument("--steps", type=int, default=20)
+    args = parser.parse_args()
+
+    data = args.image.read_bytes() if args.image else make_fixture()
+    print(f"fixture: {len(data) / 1024:.0f} KB, {args.steps} steps")
+
+    legacy = measure(legacy_step, data, args.steps)
+    passthrough = measure(passthrough_step, data, args.steps)
+    print(f"legacy decode + re-encode: {legacy:8.2f} ms CPU/step")
+    print(f"pass-through:              {passthrough:8.2f} ms CPU/step")
+    print(f"speedup:                   {legacy / passthrough:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark type_text throughput in characters per second on a device.
+
+Types 1KB, 10KB and 100KB of mixed Chinese/ASCII text into the currently
+focused input field, once as a single broadcast (the previous behaviour)
+and once chunked, optionally also through the clipboard path. Focus a
+large text field (e.g. a notes app) before running; it is cleared between
+runs.
+
+Usage:
+    python benchmarks/bench_type_text.py [--device-id ID] [--clipboard]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from phone_agent.adb import (
+    TextInputMode,
+    clear_text,
+    detect_and_set_adb_keyboard,
+    restore_keyboard,
+    type_text,
+)
+from phone_agent.adb.input import DEFAULT_CHUNK_BYTES
+
+SIZES = {"1KB": 1024, "10KB": 10 * 1024, "100KB": 100 * 1024}
+SAMPLE = "今天天气很好，我们去公园散步吧。The quick brown fox jumps over the lazy dog.\n"
+
+
+def make_text(size: int) -> str:
+    """Text of roughly size UTF-8 bytes."""
+    text = SAMPLE * (size // len(SAMPLE.encode("utf-8")) + 1)
+    return text.encode("utf-8")[:size].decode("utf-8", "ignore")
+
+
+def run(text: str, device_id: str | None, **kwargs) -> str:
+    clear_text(device_id)
+    start = time.perf_counter()
+    try:
+        type_text(text, device_id, **kwargs)
+    except Exception as e:
+        return f"failed ({type(e).__name__})"
+    elapsed = time.perf_counter() - start
+    return f"{len(text) / elapsed:,.0f} chars/s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--device-id", help="ADB device ID")
+    parser.add_argument(
+        "--clipboard", action="store_true", help="Also measure the Clipper path"
+    )
+    args = parser.parse_args()
+
+    variants = {
+        "single broadcast": {"chunk_bytes": 1 << 30},
+        f"chunked {DEFAULT_CHUNK_BYTES // 1024}KB": {},
+    }
+    if args.clipboard:
+        variants["clipboard"] = {"mode": TextInputMode.CLIPBOARD}
+
+    original_ime = detect_and_set_adb_keyboard(args.device_id)
+    try:
+        print(f"{'variant':<20}" + "".join(f"{name:>20}" for name in SIZES))
+        for name, kwargs in variants.items():
+            row = [
+                run(make_text(size), args.device_id, **kwargs)
+                for size in SIZES.values()
+            ]
+            print(f"{name:<20}" + "".join(f"{cell:>20}" for cell in row))
+    finally:
+        clear_text(args.device_id)
+        restore_keyboard(original_ime, args.device_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,14 @@ import time
 from dataclasses import dataclass
 from typing import Any, Callable
 
+from phone_agent.actions.parser import parse_calls
 from phone_agent.adb import (
+    TextInputMode,
     back,
     clear_text,
     detect_and_set_adb_keyboard,
     double_tap,
+    get_current_app,
     home,
     launch_app,
     long_press,
@@ -38,6 +41,9 @@ class ActionHandler:
         confirmation_callback: Optional callback for sensitive action confirmation.
             Should return True to proceed, False to cancel.
         takeover_callback: Optional callback for takeover requests (login, captcha).
+        settle: Wait for the screen to stop changing after each action instead
+            of sleeping for a fixed delay.
+        text_input: How Type actions insert text (see TextInputMode).
     """
 
     def __init__(
@@ -45,10 +51,22 @@ class ActionHandler:
         device_id: str | None = None,
         confirmation_callback: Callable[[str], bool] | None = None,
         takeover_callback: Callable[[str], None] | None = None,
+        settle: bool = False,
+        text_input: TextInputMode = TextInputMode.BROADCAST,
     ):
         self.device_id = device_id
+        self.settle = settle
+        self.text_input = text_input
         self.confirmation_callback = confirmation_callback or self._default_confirmation
         self.takeover_callback = takeover_callback or self._default_takeover
+        # IME to restore once the task ends; ADB Keyboard stays active until then
+        self._original_ime: str | None = None
+
+    def restore_ime(self) -> None:
+        """Restore the keyboard that was active before the first Type action."""
+        if self._original_ime is not None:
+            restore_keyboard(self._original_ime, self.device_id)
+            self._original_ime = None
 
     def execute(
         self, action: dict[str, Any], screen_width: int, screen_height: int
@@ -66,6 +84,9 @@ class ActionHandler:
         """
         action_type = action.get("_metadata")
 
+        if action_type == "batch":
+            return self._execute_batch(action["actions"], screen_width, screen_height)
+
         if action_type == "finish":
             return ActionResult(
                 success=True, should_finish=True, message=action.get("message")
@@ -95,6 +116,51 @@ class ActionHandler:
                 success=False, should_finish=False, message=f"Action failed: {e}"
             )
 
+    def _execute_batch(
+        self, actions: list[dict[str, Any]], screen_width: int, screen_height: int
+    ) -> ActionResult:
+        """
+        Execute a multi-action plan from a single model response.
+
+        Every action waits for the UI to settle before the next one runs.
+        The plan stops early when an action fails or finishes the task, or
+        when the foreground app changes other than through a Launch action,
+        since the remaining coordinates were planned for the old screen.
+
+        Args:
+            actions: Action dictionaries in execution order.
+            screen_width: Current screen width in pixels.
+            screen_height: Current screen height in pixels.
+
+        Returns:
+            ActionResult of the last executed action, with a note if the
+            plan was stopped early.
+        """
+        settle, self.settle = self.settle, True
+        try:
+            expected_app = get_current_app(self.device_id)
+            result = ActionResult(success=True, should_finish=False)
+            for index, action in enumerate(actions, start=1):
+                result = self.execute(action, screen_width, screen_height)
+                if index == len(actions) or not result.success or result.should_finish:
+                    break
+
+                current_app = get_current_app(self.device_id)
+                if action.get("action") == "Launch":
+                    expected_app = current_app
+                elif current_app != expected_app:
+                    return ActionResult(
+                        success=True,
+                        should_finish=False,
+                        message=(
+                            f"Stopped after {index}/{len(actions)} actions: "
+                            f"foreground app changed to {current_app}"
+                        ),
+                    )
+            return result
+        finally:
+            self.settle = settle
+
     def _get_handler(self, action_name: str) -> Callable | None:
         """Get the handler method for an action."""
         handlers = {
@@ -129,7 +195,7 @@ class ActionHandler:
         if not app_name:
             return ActionResult(False, False, "No app name specified")
 
-        success = launch_app(app_name, self.device_id)
+        success = launch_app(app_name, self.device_id, settle=self.settle)
         if success:
             return ActionResult(True, False)
         return ActionResult(False, False, f"App not found: {app_name}")
@@ -151,27 +217,22 @@ class ActionHandler:
                     message="User cancelled sensitive operation",
                 )
 
-        tap(x, y, self.device_id)
+        tap(x, y, self.device_id, settle=self.settle)
         return ActionResult(True, False)
 
     def _handle_type(self, action: dict, width: int, height: int) -> ActionResult:
         """Handle text input action."""
         text = action.get("text", "")
 
-        # Switch to ADB keyboard
-        original_ime = detect_and_set_adb_keyboard(self.device_id)
-        time.sleep(1.0)
+        # Switch to ADB keyboard once per task (see restore_ime)
+        if self._original_ime is None:
+            self._original_ime = detect_and_set_adb_keyboard(self.device_id)
 
         # Clear existing text and type new text
         clear_text(self.device_id)
-        time.sleep(1.0)
-
-        type_text(text, self.device_id)
-        time.sleep(1.0)
-
-        # Restore original keyboard
-        restore_keyboard(original_ime, self.device_id)
-        time.sleep(1.0)
+        type_text(
+            text, self.device_id, delay=1.0, settle=self.settle, mode=self.text_input
+        )
 
         return ActionResult(True, False)
 
@@ -186,17 +247,24 @@ class ActionHandler:
         start_x, start_y = self._convert_relative_to_absolute(start, width, height)
         end_x, end_y = self._convert_relative_to_absolute(end, width, height)
 
-        swipe(start_x, start_y, end_x, end_y, device_id=self.device_id)
+        swipe(
+            start_x,
+            start_y,
+            end_x,
+            end_y,
+            device_id=self.device_id,
+            settle=self.settle,
+        )
         return ActionResult(True, False)
 
     def _handle_back(self, action: dict, width: int, height: int) -> ActionResult:
         """Handle back button action."""
-        back(self.device_id)
+        back(self.device_id, settle=self.settle)
         return ActionResult(True, False)
 
     def _handle_home(self, action: dict, width: int, height: int) -> ActionResult:
         """Handle home button action."""
-        home(self.device_id)
+        home(self.device_id, settle=self.settle)
         return ActionResult(True, False)
 
     def _handle_double_tap(self, action: dict, width: int, height: int) -> ActionResult:
@@ -206,7 +274,7 @@ class ActionHandler:
             return ActionResult(False, False, "No element coordinates")
 
         x, y = self._convert_relative_to_absolute(element, width, height)
-        double_tap(x, y, self.device_id)
+        double_tap(x, y, self.device_id, settle=self.settle)
         return ActionResult(True, False)
 
     def _handle_long_press(self, action: dict, width: int, height: int) -> ActionResult:
@@ -216,7 +284,7 @@ class ActionHandler:
             return ActionResult(False, False, "No element coordinates")
 
         x, y = self._convert_relative_to_absolute(element, width, height)
-        long_press(x, y, device_id=self.device_id)
+        long_press(x, y, device_id=self.device_id, settle=self.settle)
         return ActionResult(True, False)
 
     def _handle_wait(self, action: dict, width: int, height: int) -> ActionResult:
@@ -233,6 +301,8 @@ class ActionHandler:
     def _handle_takeover(self, action: dict, width: int, height: int) -> ActionResult:
         """Handle takeover request (login, captcha, etc.)."""
         message = action.get("message", "User intervention required")
+        # Give the user their own keyboard back; the next Type switches again
+        self.restore_ime()
         self.takeover_callback(message)
         return ActionResult(True, False)
 
@@ -251,6 +321,7 @@ class ActionHandler:
     def _handle_interact(self, action: dict, width: int, height: int) -> ActionResult:
         """Handle interaction request (user choice needed)."""
         # This action signals that user input is needed
+        self.restore_ime()
         return ActionResult(True, False, message="User interaction required")
 
     @staticmethod
@@ -269,6 +340,12 @@ def parse_action(response: str) -> dict[str, Any]:
     """
     Parse action from model response.
 
+    The call is parsed, never evaluated (see parse_calls). Several calls,
+    one per line, form a batch: {"_metadata": "batch", "actions": [...]}.
+    A finish message with unescaped quotes, which is not a valid literal,
+    is taken verbatim from between the outer quotes. A closing </answer>
+    tag after the calls is ignored.
+
     Args:
         response: Raw response string from the model.
 
@@ -278,22 +355,24 @@ def parse_action(response: str) -> dict[str, Any]:
     Raises:
         ValueError: If the response cannot be parsed.
     """
+    response = response.strip()
+    if response.endswith("</answer>"):
+        response = response[: -len("</answer>")].rstrip()
     try:
-        # Try to evaluate as Python dict/function call
-        response = response.strip()
-        if response.startswith("do"):
-            action = eval(response)
-        elif response.startswith("finish"):
-            action = {
-                "_metadata": "finish",
-                "message": response.replace("finish(message=", "")[1:-2],
-            }
-        else:
-            raise ValueError(f"Failed to parse action: {response}")
-        return action
+        calls = parse_calls(response)
     except Exception as e:
+        if response.startswith("finish(message=") and response.endswith(")"):
+            message = response[len("finish(message=") : -1].strip()
+            if len(message) >= 2 and message[0] == message[-1] in "\"'":
+                message = message[1:-1]
+            return finish(message=message)
         raise ValueError(f"Failed to parse action: {e}")
 
+    actions = [{**kwargs, "_metadata": name} for name, kwargs in calls]
+    if len(actions) == 1:
+        return actions[0]
+    return {"_metadata": "batch", "actions": actions}
+
 
 def do(**kwargs) -> dict[str, Any]:
     """Helper function for creating 'do' actions."""
@@ -0,0 +1,242 @@
+"""Safe parser for do(...)/finish(...) calls in model output."""
+
+import re
+from typing import Any
+
+ACTION_FUNCTIONS = ("do", "finish")
+
+_TOKEN_PATTERN = re.compile(
+    r"""\s*(?:
+        (?P<str>"[^"\\]*(?:\\.[^"\\]*)*"|'[^'\\]*(?:\\.[^'\\]*)*')
+      | (?P<num>-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<name>[A-Za-z_]\w*)
+      | (?P<op>[()\[\]{},:=])
+    )""",
+    re.VERBOSE | re.DOTALL,
+)
+# Fast path: name="string" or name=[x, y], which covers nearly all actions
+_HEAD_PATTERN = re.compile(r"\s*(do|finish)\(")
+_SIMPLE_ARG_PATTERN = re.compile(
+    r"""\s*([A-Za-z_]\w*)\s*=\s*
+    (?:"([^"\\]*(?:\\.[^"\\]*)*)"|\[\s*(-?\d+)\s*,\s*(-?\d+)\s*\])
+    \s*([,)])""",
+    re.VERBOSE | re.DOTALL,
+)
+_SEPARATOR_PATTERN = re.compile(r"\s*;?\s*")
+_ESCAPE_PATTERN = re.compile(
+    r"\\(u[0-9a-fA-F]{4}|x[0-9a-fA-F]{2}|[0-7]{1,3}|.)", re.DOTALL
+)
+_ESCAPES = {
+    "n": "\n",
+    "t": "\t",
+    "r": "\r",
+    "a": "\a",
+    "b": "\b",
+    "f": "\f",
+    "v": "\v",
+    "\\": "\\",
+    '"': '"',
+    "'": "'",
+    "\n": "",
+}
+_CONSTANTS = {"True": True, "False": False, "None": None}
+_CLOSING = {"[": "]", "(": ")", "{": "}"}
+
+
+def parse_call(text: str) -> tuple[str, dict[str, Any]]:
+    """
+    Parse a single do(...) or finish(...) call.
+
+    Only keyword arguments with literal values are accepted: strings,
+    numbers, True/False/None and (nested) lists, tuples and dicts of those.
+    Nothing is evaluated. Unlike Python, strings may contain raw newlines.
+
+    Args:
+        text: Call expression, e.g. 'do(action="Tap", element=[500, 300])'.
+
+    Returns:
+        Tuple of (function name, keyword arguments).
+
+    Raises:
+        ValueError: If the text is not a well-formed call.
+    """
+    calls = parse_calls(text)
+    if len(calls) > 1:
+        raise ValueError(f"Expected a single call, got {len(calls)}")
+    return calls[0]
+
+
+def parse_calls(text: str) -> list[tuple[str, dict[str, Any]]]:
+    """
+    Parse a sequence of calls separated by whitespace or semicolons.
+
+    Args:
+        text: One or more call expressions, e.g. one per line.
+
+    Returns:
+        List of (function name, keyword arguments) in order.
+
+    Raises:
+        ValueError: If any call is malformed.
+    """
+    calls = []
+    pos = 0
+    while True:
+        name, kwargs, pos = _parse_call_at(text, pos)
+        calls.append((name, kwargs))
+        pos = _SEPARATOR_PATTERN.match(text, pos).end()
+        if pos == len(text):
+            return calls
+
+
+def _parse_call_at(text: str, pos: int) -> tuple[str, dict[str, Any], int]:
+    """Parse one call starting at pos; returns (name, kwargs, end)."""
+    simple = _parse_simple_call(text, pos)
+    if simple is not None:
+        return simple
+
+    parser = _CallParser(text, pos)
+    name, kind = parser.next_token()
+    if kind != "name" or name not in ACTION_FUNCTIONS:
+        raise ValueError(f"Expected one of {ACTION_FUNCTIONS}, got {name!r}")
+    parser.expect("(")
+
+    kwargs: dict[str, Any] = {}
+    while not parser.accept(")"):
+        key, kind = parser.next_token()
+        if kind != "name":
+            raise ValueError(f"Expected keyword argument, got {key!r}")
+        parser.expect("=")
+        kwargs[key] = parser.value()
+        if not parser.accept(","):
+            parser.expect(")")
+            break
+
+    return name, kwargs, parser.pos
+
+
+def _parse_simple_call(
+    text: str, pos: int
+) -> tuple[str, dict[str, Any], int] | None:
+    """
+    Parse a call whose arguments are all strings or [x, y] points.
+
+    Returns:
+        Same as _parse_call_at, or None if the text needs the full parser.
+    """
+    match = _HEAD_PATTERN.match(text, pos)
+    if match is None:
+        return None
+    name = match.group(1)
+    pos = match.end()
+
+    kwargs: dict[str, Any] = {}
+    while True:
+        match = _SIMPLE_ARG_PATTERN.match(text, pos)
+        if match is None:
+            return None
+        key, string, x, y, end = match.groups()
+        if x is None:
+            kwargs[key] = string if "\\" not in string else _unescape_all(string)
+        else:
+            kwargs[key] = [int(x), int(y)]
+        pos = match.end()
+        if end == ")":
+            return name, kwargs, pos
+
+
+class _CallParser:
+    """Recursive-descent parser over regex tokens."""
+
+    def __init__(self, text: str, pos: int = 0):
+        self.text = text
+        self.pos = pos
+
+    def next_token(self) -> tuple[str, str]:
+        """Consume the next token and return (text, kind)."""
+        match = _TOKEN_PATTERN.match(self.text, self.pos)
+        if match is None:
+            rest = self.text[self.pos :]
+            raise ValueError(f"Unexpected input at {self.pos}: {rest!r}")
+        self.pos = match.end()
+        kind = match.lastgroup
+        return match.group(kind), kind
+
+    def accept(self, op: str) -> bool:
+        """Consume op if it is the next token."""
+        match = _TOKEN_PATTERN.match(self.text, self.pos)
+        if match is not None and match.group("op") == op:
+            self.pos = match.end()
+            return True
+        return False
+
+    def expect(self, op: str) -> None:
+        """Consume op or raise ValueError."""
+        if not self.accept(op):
+            raise ValueError(f"Expected {op!r} at {self.pos}")
+
+    def value(self) -> Any:
+        """Parse a literal value."""
+        token, kind = self.next_token()
+        if kind == "str":
+            return _decode_string(token)
+        if kind == "num":
+            if any(c in token for c in ".eE"):
+                return float(token)
+            return int(token)
+        if kind == "name":
+            if token in _CONSTANTS:
+                return _CONSTANTS[token]
+            raise ValueError(f"Names are not allowed: {token!r}")
+        if token in _CLOSING:
+            return self.container(token)
+        raise ValueError(f"Unexpected {token!r} at {self.pos}")
+
+    def container(self, opening: str) -> Any:
+        """Parse the rest of a list, tuple or dict after its opening bracket."""
+        closing = _CLOSING[opening]
+        items: list[Any] = []
+        comma = False
+        while not self.accept(closing):
+            item = self.value()
+            if opening == "{":
+                self.expect(":")
+                item = (item, self.value())
+            items.append(item)
+            comma = self.accept(",")
+            if not comma:
+                self.expect(closing)
+                break
+
+        if opening == "[":
+            return items
+        if opening == "(":
+            # (x) is a parenthesized value, (x,) a tuple
+            return items[0] if len(items) == 1 and not comma else tuple(items)
+        try:
+            return dict(items)
+        except TypeError as e:
+            raise ValueError(f"Invalid dict key: {e}") from None
+
+
+def _decode_string(token: str) -> str:
+    """Strip the quotes from a string token and resolve escapes."""
+    body = token[1:-1]
+    if "\\" not in body:
+        return body
+    return _unescape_all(body)
+
+
+def _unescape_all(body: str) -> str:
+    """Resolve all backslash escapes in a string body."""
+    return _ESCAPE_PATTERN.sub(_unescape, body)
+
+
+def _unescape(match: re.Match) -> str:
+    """Resolve one backslash escape; unknown escapes are kept verbatim."""
+    escape = match.group(1)
+    if escape[0] in "ux" and len(escape) > 1:
+        return chr(int(escape[1:], 16))
+    if escape[0] in "01234567":
+        return chr(int(escape, 8))
+    return _ESCAPES.get(escape, match.group(0))
@@ -1,5 +1,6 @@
 """ADB utilities for Android device interaction."""
 
+from phone_agent.adb.client import ADBClient, ADBError
 from phone_agent.adb.connection import (
     ADBConnection,
     ConnectionType,
@@ -12,30 +13,45 @@ from phone_agent.adb.device import (
     double_tap,
     get_current_app,
     home,
+    invalidate_current_app,
     launch_app,
     long_press,
     recent_apps,
     swipe,
+    take_wait_time,
     tap,
+    wait_after_action,
+    wait_for_settle,
 )
 from phone_agent.adb.input import (
+    TextInputMode,
     clear_text,
     detect_and_set_adb_keyboard,
+    get_current_ime,
     restore_keyboard,
     type_text,
+    wait_for_ime,
 )
-from phone_agent.adb.screenshot import get_screenshot
+from phone_agent.adb.screenshot import CaptureMode, Screenshot, get_screenshot
+from phone_agent.adb.shell import run_shell, use_shell_pool
 
 __all__ = [
     # Screenshot
     "get_screenshot",
+    "Screenshot",
+    "CaptureMode",
     # Input
     "type_text",
+    "TextInputMode",
     "clear_text",
     "detect_and_set_adb_keyboard",
     "restore_keyboard",
+    "get_current_ime",
+    "wait_for_ime",
     # Device control
     "get_current_app",
+    "invalidate_current_app",
+    "take_wait_time",
     "tap",
     "swipe",
     "back",
@@ -44,7 +60,14 @@ __all__ = [
     "double_tap",
     "long_press",
     "launch_app",
+    "wait_for_settle",
+    "wait_after_action",
+    # Shell sessions
+    "run_shell",
+    "use_shell_pool",
     # Connection management
+    "ADBClient",
+    "ADBError",
     "ADBConnection",
     "DeviceInfo",
     "ConnectionType",
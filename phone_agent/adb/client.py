@@ -0,0 +1,340 @@
+"""Pure-Python client for the ADB server wire protocol."""
+
+import shlex
+import socket
+import struct
+import subprocess
+import threading
+
+ADB_HOST = "127.0.0.1"
+ADB_PORT = 5037
+
+_SYNC_CHUNK_SIZE = 64 * 1024
+
+
+class ADBError(Exception):
+    """Raised when the ADB server rejects a request or cannot be reached."""
+
+
+class ADBClient:
+    """
+    Talks to the local ADB server over its socket instead of spawning `adb`.
+
+    Implements the smart-socket protocol used by the adb binary itself:
+    host services (`host:devices-l`, `host:connect:...`), switching a
+    connection to a device with `host:transport:<serial>`, and the device
+    services `shell:`, `exec:` and `sync:`.
+
+    Example:
+        >>> client = ADBClient()
+        >>> client.shell(["getprop", "ro.product.model"], "emulator-5554")
+        >>> png = client.exec_out(["screencap", "-p"], "emulator-5554")
+
+    Args:
+        host: ADB server host.
+        port: ADB server port.
+        adb_path: ADB executable used to start the server if it is not
+            running. None disables auto-start.
+        timeout: Default socket timeout in seconds.
+    """
+
+    def __init__(
+        self,
+        host: str = ADB_HOST,
+        port: int = ADB_PORT,
+        adb_path: str | None = "adb",
+        timeout: float = 10,
+    ):
+        self.host = host
+        self.port = port
+        self.adb_path = adb_path
+        self.timeout = timeout
+        self._server_started = False
+        self._lock = threading.Lock()
+
+    # ---------------------------------------------------------------------
+    # Connection handling
+    # ---------------------------------------------------------------------
+
+    def _connect(
+        self, timeout: float | None = None, start_server: bool = True
+    ) -> socket.socket:
+        """Open a new connection to the ADB server, starting it if needed."""
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return socket.create_connection((self.host, self.port), timeout=timeout)
+        except ConnectionRefusedError:
+            if not start_server or not self._start_server():
+                raise ADBError(f"ADB server not running on {self.host}:{self.port}")
+        except OSError as e:
+            raise ADBError(f"Cannot connect to ADB server: {e}")
+        try:
+            return socket.create_connection((self.host, self.port), timeout=timeout)
+        except OSError as e:
+            raise ADBError(f"Cannot connect to ADB server: {e}")
+
+    def _start_server(self) -> bool:
+        """Start the ADB server once per client, like the adb binary does."""
+        if self.adb_path is None or self.host != ADB_HOST:
+            return False
+        with self._lock:
+            if self._server_started:
+                return False
+            self._server_started = True
+            try:
+                subprocess.run(
+                    [self.adb_path, "-P", str(self.port), "start-server"],
+                    capture_output=True,
+                    timeout=10,
+                )
+            except (OSError, subprocess.TimeoutExpired):
+                return False
+        return True
+
+    @staticmethod
+    def _send_request(sock: socket.socket, request: str) -> None:
+        """Send a length-prefixed request and check the OKAY/FAIL status."""
+        payload = request.encode("utf-8")
+        sock.sendall(b"%04x" % len(payload) + payload)
+        status = _recv_exact(sock, 4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            raise ADBError(_read_length_prefixed(sock).decode("utf-8", "replace"))
+        raise ADBError(f"Unexpected ADB response: {status!r}")
+
+    def open_service(
+        self, service: str, device_id: str | None = None, timeout: float | None = None
+    ) -> socket.socket:
+        """
+        Open a connection to a device service.
+
+        Args:
+            service: Service request, e.g. "shell:ls" or "sync:".
+            device_id: Device serial. None selects the only connected device.
+            timeout: Socket timeout in seconds.
+
+        Returns:
+            Socket streaming the service; the caller must close it.
+        """
+        sock = self._connect(timeout)
+        try:
+            if device_id:
+                self._send_request(sock, f"host:transport:{device_id}")
+            else:
+                self._send_request(sock, "host:transport-any")
+            self._send_request(sock, service)
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    # ---------------------------------------------------------------------
+    # Host services
+    # ---------------------------------------------------------------------
+
+    def host_command(self, request: str, timeout: float | None = None) -> str:
+        """
+        Run a host service that returns a length-prefixed string.
+
+        Args:
+            request: Host request, e.g. "host:devices-l" or "host:version".
+            timeout: Socket timeout in seconds.
+
+        Returns:
+            The response payload.
+        """
+        with self._connect(timeout) as sock:
+            self._send_request(sock, request)
+            return _read_length_prefixed(sock).decode("utf-8", "replace")
+
+    def version(self) -> int:
+        """Get the ADB server protocol version."""
+        return int(self.host_command("host:version"), 16)
+
+    def devices(self) -> str:
+        """Get the `adb devices -l` listing (without the header line)."""
+        return self.host_command("host:devices-l")
+
+    def connect(self, address: str, timeout: float | None = None) -> str:
+        """Connect the server to a TCP/IP device."""
+        return self.host_command(f"host:connect:{address}", timeout)
+
+    def disconnect(self, address: str | None = None) -> str:
+        """Disconnect a TCP/IP device, or all of them if address is None."""
+        return self.host_command(f"host:disconnect:{address or ''}")
+
+    def kill_server(self) -> None:
+        """Ask the ADB server to exit."""
+        with self._connect(start_server=False) as sock:
+            self._send_request(sock, "host:kill")
+
+    # ---------------------------------------------------------------------
+    # Device services
+    # ---------------------------------------------------------------------
+
+    def shell(
+        self,
+        command: str | list[str],
+        device_id: str | None = None,
+        timeout: float | None = None,
+    ) -> str:
+        """
+        Run a shell command and return its combined stdout/stderr.
+
+        Args:
+            command: Command string, or argument list to quote.
+            device_id: Device serial.
+            timeout: Socket timeout in seconds.
+        """
+        if not isinstance(command, str):
+            command = shlex.join(command)
+        return self._read_service(f"shell:{command}", device_id, timeout).decode(
+            "utf-8", "replace"
+        )
+
+    def exec_out(
+        self,
+        command: str | list[str],
+        device_id: str | None = None,
+        timeout: float | None = None,
+    ) -> bytes:
+        """
+        Run a command and return its raw, binary-safe stdout.
+
+        Args:
+            command: Command string, or argument list to quote.
+            device_id: Device serial.
+            timeout: Socket timeout in seconds.
+        """
+        if not isinstance(command, str):
+            command = shlex.join(command)
+        return self._read_service(f"exec:{command}", device_id, timeout)
+
+    def tcpip(self, port: int, device_id: str | None = None) -> str:
+        """Restart adbd on the device in TCP/IP mode."""
+        return self._read_service(f"tcpip:{port}", device_id).decode(
+            "utf-8", "replace"
+        )
+
+    def open_shell(
+        self, device_id: str | None = None, timeout: float | None = None
+    ) -> socket.socket:
+        """
+        Open an interactive shell without a PTY.
+
+        The returned socket is a raw bidirectional stream: commands are
+        written to it and their output is read back, as with `adb shell -T`.
+        """
+        return self.open_service("shell,raw:", device_id, timeout)
+
+    def stat(
+        self, remote_path: str, device_id: str | None = None
+    ) -> tuple[int, int, int]:
+        """
+        Stat a file on the device using the sync protocol.
+
+        Returns:
+            Tuple of (mode, size, mtime); all zero if the path does not exist.
+        """
+        with self.open_service("sync:", device_id) as sock:
+            path = remote_path.encode("utf-8")
+            sock.sendall(b"STAT" + struct.pack("<I", len(path)) + path)
+
+            response = _recv_exact(sock, 16)
+            if response[:4] != b"STAT":
+                raise ADBError(f"Unexpected sync response: {response[:4]!r}")
+
+            sock.sendall(b"QUIT" + struct.pack("<I", 0))
+            return struct.unpack("<III", response[4:])
+
+    def pull(self, remote_path: str, device_id: str | None = None) -> bytes:
+        """Read a file from the device using the sync protocol."""
+        with self.open_service("sync:", device_id) as sock:
+            path = remote_path.encode("utf-8")
+            sock.sendall(b"RECV" + struct.pack("<I", len(path)) + path)
+
+            chunks = []
+            while True:
+                header = _recv_exact(sock, 8)
+                tag, length = header[:4], struct.unpack("<I", header[4:])[0]
+                if tag == b"DATA":
+                    chunks.append(_recv_exact(sock, length))
+                elif tag == b"DONE":
+                    break
+                elif tag == b"FAIL":
+                    raise ADBError(_recv_exact(sock, length).decode("utf-8", "replace"))
+                else:
+                    raise ADBError(f"Unexpected sync response: {tag!r}")
+
+            sock.sendall(b"QUIT" + struct.pack("<I", 0))
+            return b"".join(chunks)
+
+    def push(
+        self,
+        data: bytes,
+        remote_path: str,
+        device_id: str | None = None,
+        mode: int = 0o644,
+        mtime: int = 0,
+    ) -> None:
+        """Write a file to the device using the sync protocol."""
+        with self.open_service("sync:", device_id) as sock:
+            spec = f"{remote_path},{0o100000 | mode}".encode("utf-8")
+            sock.sendall(b"SEND" + struct.pack("<I", len(spec)) + spec)
+
+            view = memoryview(data)
+            for offset in range(0, len(view), _SYNC_CHUNK_SIZE):
+                chunk = view[offset : offset + _SYNC_CHUNK_SIZE]
+                sock.sendall(b"DATA" + struct.pack("<I", len(chunk)))
+                sock.sendall(chunk)
+            sock.sendall(b"DONE" + struct.pack("<I", mtime))
+
+            header = _recv_exact(sock, 8)
+            tag, length = header[:4], struct.unpack("<I", header[4:])[0]
+            if tag == b"FAIL":
+                raise ADBError(_recv_exact(sock, length).decode("utf-8", "replace"))
+            if tag != b"OKAY":
+                raise ADBError(f"Unexpected sync response: {tag!r}")
+
+            sock.sendall(b"QUIT" + struct.pack("<I", 0))
+
+    def _read_service(
+        self, service: str, device_id: str | None, timeout: float | None = None
+    ) -> bytes:
+        """Open a service and read its output until the device closes it."""
+        with self.open_service(service, device_id, timeout) as sock:
+            chunks = []
+            while True:
+                chunk = sock.recv(_SYNC_CHUNK_SIZE)
+                if not chunk:
+                    return b"".join(chunks)
+                chunks.append(chunk)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    """Read exactly size bytes from the socket."""
+    data = bytearray()
+    while len(data) < size:
+        try:
+            chunk = sock.recv(size - len(data))
+        except socket.timeout:
+            raise ADBError("ADB server did not respond in time") from None
+        if not chunk:
+            raise ADBError("ADB connection closed unexpectedly")
+        data.extend(chunk)
+    return bytes(data)
+
+
+def _read_length_prefixed(sock: socket.socket) -> bytes:
+    """Read a payload prefixed with a 4-digit hex length."""
+    length = int(_recv_exact(sock, 4), 16)
+    return _recv_exact(sock, length)
+
+
+_default_client = ADBClient()
+
+
+def get_client() -> ADBClient:
+    """Get the shared ADB client used by the module-level helpers."""
+    return _default_client
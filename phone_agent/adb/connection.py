@@ -6,6 +6,8 @@ from dataclasses import dataclass
 from enum import Enum
 from typing import Optional
 
+from phone_agent.adb.client import ADBClient, ADBError
+
 
 class ConnectionType(Enum):
     """Type of ADB connection."""
@@ -30,7 +32,9 @@ class ADBConnection:
     """
     Manages ADB connections to Android devices.
 
-    Supports USB, WiFi, and remote TCP/IP connections.
+    Supports USB, WiFi, and remote TCP/IP connections. Requests go straight
+    to the ADB server socket through ADBClient; the adb executable is only
+    used to start the server.
 
     Example:
         >>> conn = ADBConnection()
@@ -42,14 +46,16 @@ class ADBConnection:
         >>> conn.disconnect("192.168.1.100:5555")
     """
 
-    def __init__(self, adb_path: str = "adb"):
+    def __init__(self, adb_path: str = "adb", client: ADBClient | None = None):
         """
         Initialize ADB connection manager.
 
         Args:
             adb_path: Path to ADB executable.
+            client: ADB server client. Defaults to one on the local server.
         """
         self.adb_path = adb_path
+        self.client = client or ADBClient(adb_path=adb_path)
 
     def connect(self, address: str, timeout: int = 10) -> tuple[bool, str]:
         """
@@ -71,14 +77,7 @@ class ADBConnection:
             address = f"{address}:5555"  # Default ADB port
 
         try:
-            result = subprocess.run(
-                [self.adb_path, "connect", address],
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-            )
-
-            output = result.stdout + result.stderr
+            output = self.client.connect(address, timeout)
 
             if "connected" in output.lower():
                 return True, f"Connected to {address}"
@@ -87,8 +86,8 @@ class ADBConnection:
             else:
                 return False, output.strip()
 
-        except subprocess.TimeoutExpired:
-            return False, f"Connection timeout after {timeout}s"
+        except ADBError as e:
+            return False, f"Connection failed: {e}"
         except Exception as e:
             return False, f"Connection error: {e}"
 
@@ -103,13 +102,7 @@ class ADBConnection:
             Tuple of (success, message).
         """
         try:
-            cmd = [self.adb_path, "disconnect"]
-            if address:
-                cmd.append(address)
-
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=5)
-
-            output = result.stdout + result.stderr
+            output = self.client.disconnect(address)
             return True, output.strip() or "Disconnected"
 
         except Exception as e:
@@ -123,15 +116,10 @@ class ADBConnection:
             List of DeviceInfo objects.
         """
         try:
-            result = subprocess.run(
-                [self.adb_path, "devices", "-l"],
-                capture_output=True,
-                text=True,
-                timeout=5,
-            )
+            output = self.client.devices()
 
             devices = []
-            for line in result.stdout.strip().split("\n")[1:]:  # Skip header
+            for line in output.strip().split("\n"):
                 if not line.strip():
                     continue
 
@@ -234,16 +222,9 @@ class ADBConnection:
             After this, you can disconnect USB and connect via WiFi.
         """
         try:
-            cmd = [self.adb_path]
-            if device_id:
-                cmd.extend(["-s", device_id])
-            cmd.extend(["tcpip", str(port)])
+            output = self.client.tcpip(port, device_id)
 
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-
-            output = result.stdout + result.stderr
-
-            if "restarting" in output.lower() or result.returncode == 0:
+            if "restarting" in output.lower():
                 time.sleep(2)  # Wait for ADB to restart
                 return True, f"TCP/IP mode enabled on port {port}"
             else:
@@ -263,15 +244,10 @@ class ADBConnection:
             IP address string or None if not found.
         """
         try:
-            cmd = [self.adb_path]
-            if device_id:
-                cmd.extend(["-s", device_id])
-            cmd.extend(["shell", "ip", "route"])
-
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=5)
+            output = self.client.shell(["ip", "route"], device_id, timeout=5)
 
             # Parse IP from route output
-            for line in result.stdout.split("\n"):
+            for line in output.split("\n"):
                 if "src" in line:
                     parts = line.split()
                     for i, part in enumerate(parts):
@@ -279,15 +255,11 @@ class ADBConnection:
                             return parts[i + 1]
 
             # Alternative: try wlan0 interface
-            cmd[-1] = "ip addr show wlan0"
-            result = subprocess.run(
-                cmd[:-1] + ["shell", "ip", "addr", "show", "wlan0"],
-                capture_output=True,
-                text=True,
-                timeout=5,
+            output = self.client.shell(
+                ["ip", "addr", "show", "wlan0"], device_id, timeout=5
             )
 
-            for line in result.stdout.split("\n"):
+            for line in output.split("\n"):
                 if "inet " in line:
                     parts = line.strip().split()
                     if len(parts) >= 2:
@@ -308,13 +280,14 @@ class ADBConnection:
         """
         try:
             # Kill server
-            subprocess.run(
-                [self.adb_path, "kill-server"], capture_output=True, timeout=5
-            )
+            try:
+                self.client.kill_server()
+            except ADBError:
+                pass  # Not running
 
             time.sleep(1)
 
-            # Start server
+            # Start server (spawning it needs the adb executable)
             subprocess.run(
                 [self.adb_path, "start-server"], capture_output=True, timeout=5
             )
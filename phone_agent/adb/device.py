@@ -1,41 +1,79 @@
 """Device control utilities for Android automation."""
 
-import os
-import subprocess
+import re
+import threading
 import time
 from typing import List, Optional, Tuple
 
-from phone_agent.config.apps import APP_PACKAGES
+from phone_agent.adb.shell import run_shell
+from phone_agent.config.apps import (
+    find_known_packages,
+    get_app_name,
+    get_package_name,
+)
 
 
-def get_current_app(device_id: str | None = None) -> str:
+# Matches the package in focus records such as
+#   mCurrentFocus=Window{1a2b u0 com.tencent.mm/com.tencent.mm.ui.LauncherUI}
+#   mFocusedApp=ActivityRecord{3c4d u0 com.tencent.mm/.ui.LauncherUI t42}
+_FOCUS_PATTERN = re.compile(
+    r"(?:mCurrentFocus|mFocusedApp)=\S+[ \t](?:\S+[ \t])*?([A-Za-z][\w.]*)/"
+)
+_FOCUS_COMMAND = "dumpsys window displays | grep -E 'mCurrentFocus|mFocusedApp'"
+_FOCUS_FALLBACK_COMMAND = "dumpsys window | grep -E 'mCurrentFocus|mFocusedApp'"
+
+# device_id -> (timestamp, app name); cleared by every input action
+_current_app_cache: dict[str | None, tuple[float, str]] = {}
+
+# Seconds each thread spent in wait_after_action since the last take_wait_time
+_wait_time = threading.local()
+
+
+def get_current_app(device_id: str | None = None, max_age: float = 2.0) -> str:
     """
     Get the currently focused app name.
 
+    Only the focus records of `dumpsys window` are transferred and parsed.
+    The result is cached per device until the next input action or for
+    max_age seconds, whichever comes first.
+
     Args:
         device_id: Optional ADB device ID for multi-device setups.
+        max_age: Maximum age in seconds of a cached result. 0 disables caching.
 
     Returns:
         The app name if recognized, otherwise "System Home".
     """
-    adb_prefix = _get_adb_prefix(device_id)
+    cached = _current_app_cache.get(device_id)
+    if cached and time.monotonic() - cached[0] < max_age:
+        return cached[1]
 
-    result = subprocess.run(
-        adb_prefix + ["shell", "dumpsys", "window"], capture_output=True, text=True
-    )
-    output = result.stdout
+    output = run_shell(["sh", "-c", _FOCUS_COMMAND], device_id)
+    if "mCurrentFocus" not in output and "mFocusedApp" not in output:
+        # Older Android versions do not list focus under "displays"
+        output = run_shell(["sh", "-c", _FOCUS_FALLBACK_COMMAND], device_id)
+
+    # Prefer the package/activity records, then any known package in the lines
+    packages = [p for p in _FOCUS_PATTERN.findall(output) if get_app_name(p)]
+    packages = packages or find_known_packages(output)
+    app_name = get_app_name(packages[0]) if packages else "System Home"
+
+    _current_app_cache[device_id] = (time.monotonic(), app_name)
+    return app_name
 
-    # Parse window focus info
-    for line in output.split("\n"):
-        if "mCurrentFocus" in line or "mFocusedApp" in line:
-            for app_name, package in APP_PACKAGES.items():
-                if package in line:
-                    return app_name
 
-    return "System Home"
+def invalidate_current_app(device_id: str | None = None) -> None:
+    """Drop the cached foreground app for a device."""
+    _current_app_cache.pop(device_id, None)
 
 
-def tap(x: int, y: int, device_id: str | None = None, delay: float = 1.0) -> None:
+def tap(
+    x: int,
+    y: int,
+    device_id: str | None = None,
+    delay: float = 1.0,
+    settle: bool = False,
+) -> None:
     """
     Tap at the specified coordinates.
 
@@ -44,17 +82,19 @@ def tap(x: int, y: int, device_id: str | None = None, delay: float = 1.0) -> Non
         y: Y coordinate.
         device_id: Optional ADB device ID.
         delay: Delay in seconds after tap.
+        settle: Return as soon as the screen stops changing, waiting at most
+            delay seconds (see wait_for_settle).
     """
-    adb_prefix = _get_adb_prefix(device_id)
-
-    subprocess.run(
-        adb_prefix + ["shell", "input", "tap", str(x), str(y)], capture_output=True
-    )
-    time.sleep(delay)
+    run_shell(["input", "tap", str(x), str(y)], device_id)
+    wait_after_action(device_id, delay, settle)
 
 
 def double_tap(
-    x: int, y: int, device_id: str | None = None, delay: float = 1.0
+    x: int,
+    y: int,
+    device_id: str | None = None,
+    delay: float = 1.0,
+    settle: bool = False,
 ) -> None:
     """
     Double tap at the specified coordinates.
@@ -64,17 +104,13 @@ def double_tap(
         y: Y coordinate.
         device_id: Optional ADB device ID.
         delay: Delay in seconds after double tap.
+        settle: Return as soon as the screen stops changing, waiting at most
+            delay seconds (see wait_for_settle).
     """
-    adb_prefix = _get_adb_prefix(device_id)
-
-    subprocess.run(
-        adb_prefix + ["shell", "input", "tap", str(x), str(y)], capture_output=True
-    )
+    run_shell(["input", "tap", str(x), str(y)], device_id)
     time.sleep(0.1)
-    subprocess.run(
-        adb_prefix + ["shell", "input", "tap", str(x), str(y)], capture_output=True
-    )
-    time.sleep(delay)
+    run_shell(["input", "tap", str(x), str(y)], device_id)
+    wait_after_action(device_id, delay, settle)
 
 
 def long_press(
@@ -83,6 +119,7 @@ def long_press(
     duration_ms: int = 3000,
     device_id: str | None = None,
     delay: float = 1.0,
+    settle: bool = False,
 ) -> None:
     """
     Long press at the specified coordinates.
@@ -93,15 +130,14 @@ def long_press(
         duration_ms: Duration of press in milliseconds.
         device_id: Optional ADB device ID.
         delay: Delay in seconds after long press.
+        settle: Return as soon as the screen stops changing, waiting at most
+            delay seconds (see wait_for_settle).
     """
-    adb_prefix = _get_adb_prefix(device_id)
-
-    subprocess.run(
-        adb_prefix
-        + ["shell", "input", "swipe", str(x), str(y), str(x), str(y), str(duration_ms)],
-        capture_output=True,
+    run_shell(
+        ["input", "swipe", str(x), str(y), str(x), str(y), str(duration_ms)],
+        device_id,
     )
-    time.sleep(delay)
+    wait_after_action(device_id, delay, settle)
 
 
 def swipe(
@@ -112,6 +148,7 @@ def swipe(
     duration_ms: int | None = None,
     device_id: str | None = None,
     delay: float = 1.0,
+    settle: bool = False,
 ) -> None:
     """
     Swipe from start to end coordinates.
@@ -124,19 +161,17 @@ def swipe(
         duration_ms: Duration of swipe in milliseconds (auto-calculated if None).
         device_id: Optional ADB device ID.
         delay: Delay in seconds after swipe.
+        settle: Return as soon as the screen stops changing, waiting at most
+            delay seconds (see wait_for_settle).
     """
-    adb_prefix = _get_adb_prefix(device_id)
-
     if duration_ms is None:
         # Calculate duration based on distance
         dist_sq = (start_x - end_x) ** 2 + (start_y - end_y) ** 2
         duration_ms = int(dist_sq / 1000)
         duration_ms = max(1000, min(duration_ms, 2000))  # Clamp between 1000-2000ms
 
-    subprocess.run(
-        adb_prefix
-        + [
-            "shell",
+    run_shell(
+        [
             "input",
             "swipe",
             str(start_x),
@@ -145,61 +180,65 @@ def swipe(
             str(end_y),
             str(duration_ms),
         ],
-        capture_output=True,
+        device_id,
     )
-    time.sleep(delay)
+    wait_after_action(device_id, delay, settle)
 
 
-def back(device_id: str | None = None, delay: float = 1.0) -> None:
+def back(
+    device_id: str | None = None, delay: float = 1.0, settle: bool = False
+) -> None:
     """
     Press the back button.
 
     Args:
         device_id: Optional ADB device ID.
         delay: Delay in seconds after pressing back.
+        settle: Return as soon as the screen stops changing, waiting at most
+            delay seconds (see wait_for_settle).
     """
-    adb_prefix = _get_adb_prefix(device_id)
-
-    subprocess.run(
-        adb_prefix + ["shell", "input", "keyevent", "4"], capture_output=True
-    )
-    time.sleep(delay)
+    run_shell(["input", "keyevent", "4"], device_id)
+    wait_after_action(device_id, delay, settle)
 
 
-def home(device_id: str | None = None, delay: float = 1.0) -> None:
+def home(
+    device_id: str | None = None, delay: float = 1.0, settle: bool = False
+) -> None:
     """
     Press the home button.
 
     Args:
         device_id: Optional ADB device ID.
         delay: Delay in seconds after pressing home.
+        settle: Return as soon as the screen stops changing, waiting at most
+            delay seconds (see wait_for_settle).
     """
-    adb_prefix = _get_adb_prefix(device_id)
-
-    subprocess.run(
-        adb_prefix + ["shell", "input", "keyevent", "KEYCODE_HOME"], capture_output=True
-    )
-    time.sleep(delay)
+    run_shell(["input", "keyevent", "KEYCODE_HOME"], device_id)
+    wait_after_action(device_id, delay, settle)
 
 
-def recent_apps(device_id: str | None = None, delay: float = 1.0) -> None:
+def recent_apps(
+    device_id: str | None = None, delay: float = 1.0, settle: bool = False
+) -> None:
     """
     Press the recent apps (app switch) button.
 
     Args:
         device_id: Optional ADB device ID.
         delay: Delay in seconds after pressing recent apps.
+        settle: Return as soon as the screen stops changing, waiting at most
+            delay seconds (see wait_for_settle).
     """
-    adb_prefix = _get_adb_prefix(device_id)
-
-    subprocess.run(
-        adb_prefix + ["shell", "input", "keyevent", "KEYCODE_APP_SWITCH"],
-        capture_output=True,
-    )
-    time.sleep(delay)
+    run_shell(["input", "keyevent", "KEYCODE_APP_SWITCH"], device_id)
+    wait_after_action(device_id, delay, settle)
 
 
-def launch_app(app_name: str, device_id: str | None = None, delay: float = 1.0) -> bool:
+def launch_app(
+    app_name: str,
+    device_id: str | None = None,
+    delay: float = 1.0,
+    settle: bool = False,
+) -> bool:
     """
     Launch an app by name.
 
@@ -207,20 +246,18 @@ def launch_app(app_name: str, device_id: str | None = None, delay: float = 1.0)
         app_name: The app name (must be in APP_PACKAGES).
         device_id: Optional ADB device ID.
         delay: Delay in seconds after launching.
+        settle: Return as soon as the screen stops changing, waiting at most
+            delay seconds (see wait_for_settle).
 
     Returns:
         True if app was launched, False if app not found.
     """
-    if app_name not in APP_PACKAGES:
+    package = get_package_name(app_name)
+    if package is None:
         return False
 
-    adb_prefix = _get_adb_prefix(device_id)
-    package = APP_PACKAGES[app_name]
-
-    subprocess.run(
-        adb_prefix
-        + [
-            "shell",
+    run_shell(
+        [
             "monkey",
             "-p",
             package,
@@ -228,14 +265,89 @@ def launch_app(app_name: str, device_id: str | None = None, delay: float = 1.0)
             "android.intent.category.LAUNCHER",
             "1",
         ],
-        capture_output=True,
+        device_id,
     )
-    time.sleep(delay)
+    wait_after_action(device_id, delay, settle)
     return True
 
 
-def _get_adb_prefix(device_id: str | None) -> list:
-    """Get ADB command prefix with optional device specifier."""
-    if device_id:
-        return ["adb", "-s", device_id]
-    return ["adb"]
+def wait_for_settle(
+    device_id: str | None = None,
+    timeout: float = 1.0,
+    interval: float = 0.05,
+    min_wait: float = 0.15,
+    stable_samples: int = 2,
+) -> float:
+    """
+    Wait until the screen stops changing.
+
+    Polls a hash of the framebuffer computed on the device
+    (`screencap | md5sum`), so only a few bytes cross the ADB link per
+    sample, and returns once stable_samples consecutive hashes match.
+
+    Args:
+        device_id: Optional ADB device ID.
+        timeout: Maximum time to wait in seconds.
+        interval: Pause between samples in seconds.
+        min_wait: Initial wait so the UI can start reacting to the input.
+        stable_samples: Number of consecutive identical frames required.
+
+    Returns:
+        Seconds spent waiting.
+    """
+    start = time.monotonic()
+    time.sleep(min(min_wait, timeout))
+
+    previous = None
+    matches = 1
+    while time.monotonic() - start < timeout:
+        frame_hash = _frame_hash(device_id)
+        if frame_hash == previous:
+            matches += 1
+            if matches >= stable_samples:
+                break
+        else:
+            previous = frame_hash
+            matches = 1
+        time.sleep(interval)
+
+    return time.monotonic() - start
+
+
+def _frame_hash(device_id: str | None) -> str:
+    """Hash the current framebuffer on the device."""
+    return run_shell(["sh", "-c", "screencap | md5sum"], device_id).strip()
+
+
+def take_wait_time() -> float:
+    """
+    Get and reset the time the calling thread spent waiting after actions.
+
+    Returns:
+        Seconds spent in post-action sleeps or settle waits.
+    """
+    elapsed = getattr(_wait_time, "total", 0.0)
+    _wait_time.total = 0.0
+    return elapsed
+
+
+def wait_after_action(device_id: str | None, delay: float, settle: bool) -> None:
+    """
+    Wait after an input action and count the time for take_wait_time.
+
+    Also drops the cached foreground app, since the action may have changed it.
+
+    Args:
+        device_id: Optional ADB device ID for multi-device setups.
+        delay: Seconds to sleep, or the cap on the settle wait.
+        settle: Wait for the UI to settle instead of sleeping the full delay.
+    """
+    invalidate_current_app(device_id)
+    start = time.perf_counter()
+    if settle:
+        wait_for_settle(device_id, timeout=delay)
+    else:
+        time.sleep(delay)
+    _wait_time.total = getattr(_wait_time, "total", 0.0) + (
+        time.perf_counter() - start
+    )
@@ -1,40 +1,82 @@
 """Input utilities for Android device text input."""
 
 import base64
-import subprocess
-from typing import Optional
+import time
+from enum import Enum
+from typing import Iterator
 
+from phone_agent.adb.client import ADBError
+from phone_agent.adb.device import wait_after_action
+from phone_agent.adb.shell import run_shell
 
-def type_text(text: str, device_id: str | None = None) -> None:
+ADB_KEYBOARD_IME = "com.android.adbkeyboard/.AdbIME"
+
+# Broadcast action of the Clipper app (https://github.com/majido/clipper)
+CLIPPER_SET_ACTION = "clipper.set"
+
+# UTF-8 bytes per broadcast; keeps each argument far below the kernel's
+# 128 KiB per-argument limit and the binder transaction size
+DEFAULT_CHUNK_BYTES = 16 * 1024
+
+# Seconds to wait after an IME switch that could not be confirmed
+IME_FALLBACK_DELAY = 1.0
+
+
+class TextInputMode(Enum):
+    """How type_text inserts text."""
+
+    # ADB Keyboard ADB_INPUT_B64 broadcast, needs ADB Keyboard as the IME
+    BROADCAST = "broadcast"
+    # Set the clipboard through Clipper, then send KEYCODE_PASTE
+    CLIPBOARD = "clipboard"
+
+
+def type_text(
+    text: str,
+    device_id: str | None = None,
+    delay: float = 0.0,
+    settle: bool = False,
+    mode: TextInputMode = TextInputMode.BROADCAST,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+) -> None:
     """
-    Type text into the currently focused input field using ADB Keyboard.
+    Type text into the currently focused input field.
+
+    Long text is sent in chunks of at most chunk_bytes UTF-8 bytes, split on
+    character boundaries. Chunks are sent one after another and each command
+    returns only once the device has handled it, so they arrive in order.
 
     Args:
         text: The text to type.
         device_id: Optional ADB device ID for multi-device setups.
+        delay: Delay in seconds after typing.
+        settle: Return as soon as the screen stops changing, waiting at most
+            delay seconds (see wait_for_settle).
+        mode: Input path, see TextInputMode.
+        chunk_bytes: Maximum UTF-8 bytes per chunk.
+
+    Raises:
+        ADBError: If a broadcast did not complete; earlier chunks may
+            already have been typed.
 
     Note:
-        Requires ADB Keyboard to be installed on the device.
+        BROADCAST requires ADB Keyboard to be installed on the device.
         See: https://github.com/nicnocquee/AdbKeyboard
+        CLIPBOARD requires the Clipper app.
     """
-    adb_prefix = _get_adb_prefix(device_id)
-    encoded_text = base64.b64encode(text.encode("utf-8")).decode("utf-8")
-
-    subprocess.run(
-        adb_prefix
-        + [
-            "shell",
-            "am",
-            "broadcast",
-            "-a",
-            "ADB_INPUT_B64",
-            "--es",
-            "msg",
-            encoded_text,
-        ],
-        capture_output=True,
-        text=True,
-    )
+    for chunk in _utf8_chunks(text.encode("utf-8"), chunk_bytes):
+        if mode is TextInputMode.CLIPBOARD:
+            _broadcast(
+                ["-a", CLIPPER_SET_ACTION, "-e", "text", chunk.decode("utf-8")],
+                device_id,
+            )
+            run_shell(["input", "keyevent", "KEYCODE_PASTE"], device_id)
+        else:
+            encoded_text = base64.b64encode(chunk).decode("ascii")
+            _broadcast(["-a", "ADB_INPUT_B64", "--es", "msg", encoded_text], device_id)
+
+    if delay:
+        wait_after_action(device_id, delay, settle)
 
 
 def clear_text(device_id: str | None = None) -> None:
@@ -44,42 +86,69 @@ def clear_text(device_id: str | None = None) -> None:
     Args:
         device_id: Optional ADB device ID for multi-device setups.
     """
-    adb_prefix = _get_adb_prefix(device_id)
+    _broadcast(["-a", "ADB_CLEAR_TEXT"], device_id)
 
-    subprocess.run(
-        adb_prefix + ["shell", "am", "broadcast", "-a", "ADB_CLEAR_TEXT"],
-        capture_output=True,
-        text=True,
-    )
+
+def get_current_ime(device_id: str | None = None) -> str:
+    """
+    Get the current default input method.
+
+    Args:
+        device_id: Optional ADB device ID for multi-device setups.
+
+    Returns:
+        The IME identifier, e.g. "com.android.adbkeyboard/.AdbIME".
+    """
+    return run_shell(
+        ["settings", "get", "secure", "default_input_method"], device_id
+    ).strip()
+
+
+def wait_for_ime(
+    ime: str,
+    device_id: str | None = None,
+    timeout: float = 2.0,
+    interval: float = 0.05,
+) -> bool:
+    """
+    Wait until the given IME is the default input method.
+
+    Args:
+        ime: The IME identifier to wait for.
+        device_id: Optional ADB device ID for multi-device setups.
+        timeout: Maximum seconds to wait.
+        interval: Seconds between polls.
+
+    Returns:
+        True if the IME became active within the timeout.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        if get_current_ime(device_id) == ime:
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
 
 
 def detect_and_set_adb_keyboard(device_id: str | None = None) -> str:
     """
     Detect current keyboard and switch to ADB Keyboard if needed.
 
+    Returns once the switch is confirmed by the default_input_method
+    setting, or after IME_FALLBACK_DELAY if it cannot be confirmed.
+
     Args:
         device_id: Optional ADB device ID for multi-device setups.
 
     Returns:
         The original keyboard IME identifier for later restoration.
     """
-    adb_prefix = _get_adb_prefix(device_id)
-
-    # Get current IME
-    result = subprocess.run(
-        adb_prefix + ["shell", "settings", "get", "secure", "default_input_method"],
-        capture_output=True,
-        text=True,
-    )
-    current_ime = (result.stdout + result.stderr).strip()
+    current_ime = get_current_ime(device_id)
 
     # Switch to ADB Keyboard if not already set
-    if "com.android.adbkeyboard/.AdbIME" not in current_ime:
-        subprocess.run(
-            adb_prefix + ["shell", "ime", "set", "com.android.adbkeyboard/.AdbIME"],
-            capture_output=True,
-            text=True,
-        )
+    if current_ime != ADB_KEYBOARD_IME:
+        _set_ime(ADB_KEYBOARD_IME, device_id)
 
     # Warm up the keyboard
     type_text("", device_id)
@@ -95,15 +164,42 @@ def restore_keyboard(ime: str, device_id: str | None = None) -> None:
         ime: The IME identifier to restore.
         device_id: Optional ADB device ID for multi-device setups.
     """
-    adb_prefix = _get_adb_prefix(device_id)
-
-    subprocess.run(
-        adb_prefix + ["shell", "ime", "set", ime], capture_output=True, text=True
-    )
-
-
-def _get_adb_prefix(device_id: str | None) -> list:
-    """Get ADB command prefix with optional device specifier."""
-    if device_id:
-        return ["adb", "-s", device_id]
-    return ["adb"]
+    # "null" or an empty value means no IME was recorded
+    if "/" not in ime or ime == ADB_KEYBOARD_IME:
+        return
+    _set_ime(ime, device_id)
+
+
+def _set_ime(ime: str, device_id: str | None) -> None:
+    """Switch the IME and wait for it, or for a fixed delay if unconfirmed."""
+    run_shell(["ime", "set", ime], device_id)
+    if not wait_for_ime(ime, device_id):
+        # Some ROMs report the setting late or not at all
+        print(f"Warning: could not confirm IME switch to {ime}, waiting instead")
+        time.sleep(IME_FALLBACK_DELAY)
+
+
+def _broadcast(args: list[str], device_id: str | None) -> None:
+    """Send a broadcast and wait for it to be handled."""
+    # am broadcast returns once all receivers have handled the broadcast
+    output = run_shell(["am", "broadcast", *args], device_id)
+    if "Broadcast completed" not in output:
+        raise ADBError(f"Broadcast {args[1]} failed: {output.strip()}")
+
+
+def _utf8_chunks(data: bytes, size: int) -> Iterator[bytes]:
+    """Split UTF-8 data into chunks of at most size bytes on character starts."""
+    if not data:
+        # An empty broadcast is still sent, e.g. to warm up the keyboard
+        yield data
+        return
+
+    size = max(size, 4)  # room for any UTF-8 character
+    start = 0
+    while start < len(data):
+        end = min(start + size, len(data))
+        # Back off continuation bytes (10xxxxxx) so no character is split
+        while end < len(data) and data[end] & 0xC0 == 0x80:
+            end -= 1
+        yield data[start:end]
+        start = end
@@ -1,88 +1,205 @@
 """Screenshot utilities for capturing Android device screen."""
 
 import base64
-import os
+import functools
 import subprocess
-import tempfile
-import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
+from enum import Enum
 from io import BytesIO
-from typing import Tuple
+from typing import Any, Tuple
 
+import numpy as np
 from PIL import Image
 
+from phone_agent.adb.client import ADBError, get_client
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+DEFAULT_SCREEN_SIZE = (1080, 2400)
+
+# screencap raw pixel formats (android.graphics.PixelFormat) -> bytes per pixel
+_RAW_FORMATS = {
+    1: 4,  # RGBA_8888
+    2: 4,  # RGBX_8888
+    5: 4,  # BGRA_8888
+}
+
+
+class CaptureMode(Enum):
+    """How the screen is transferred from the device."""
+
+    PNG = "png"  # screencap -p, PNG-encoded on the device
+    RAW = "raw"  # screencap, raw framebuffer with no encoding on the device
+
 
 @dataclass
 class Screenshot:
-    """Represents a captured screenshot."""
+    """
+    Represents a captured screenshot.
+
+    A screenshot holds either the PNG bytes or the raw RGBA pixels (or both).
+    The missing representation and the base64 string are derived lazily on
+    first access and cached on the object.
+    """
 
-    base64_data: str
     width: int
     height: int
     is_sensitive: bool = False
-
-
-def get_screenshot(device_id: str | None = None, timeout: int = 10) -> Screenshot:
+    pixels: Any = None  # numpy array of shape (height, width, 4), uint8 RGBA
+    png_data: bytes | None = None
+    _base64_data: str | None = field(default=None, repr=False)
+
+    @property
+    def base64_data(self) -> str:
+        """Base64-encoded PNG of the screenshot."""
+        if self._base64_data is None:
+            self._base64_data = base64.b64encode(self.to_png()).decode("utf-8")
+        return self._base64_data
+
+    def to_png(self) -> bytes:
+        """Get the screenshot as PNG bytes, encoding it at most once."""
+        if self.png_data is None:
+            buffered = BytesIO()
+            self.to_image().save(buffered, format="PNG")
+            self.png_data = buffered.getvalue()
+        return self.png_data
+
+    def to_image(self) -> Image.Image:
+        """Get the screenshot as an RGB PIL image."""
+        if self.pixels is not None:
+            return Image.fromarray(self.pixels, "RGBA").convert("RGB")
+        return Image.open(BytesIO(self.png_data)).convert("RGB")
+
+    def to_array(self) -> np.ndarray:
+        """Get the screenshot as a (height, width, 4) RGBA uint8 array."""
+        if self.pixels is None:
+            self.pixels = np.asarray(
+                Image.open(BytesIO(self.png_data)).convert("RGBA")
+            )
+        return self.pixels
+
+
+def get_screenshot(
+    device_id: str | None = None,
+    timeout: int = 10,
+    mode: CaptureMode = CaptureMode.PNG,
+    fallback_size: Tuple[int, int] | None = None,
+) -> Screenshot:
     """
     Capture a screenshot from the connected Android device.
 
+    The image is streamed over stdout with `exec:screencap` on the ADB server
+    socket (or `adb exec-out` as a fallback), so no file is written on the
+    device or on the host and concurrent captures do not interfere.
+
     Args:
         device_id: Optional ADB device ID for multi-device setups.
         timeout: Timeout in seconds for screenshot operations.
+        mode: CaptureMode.PNG to let the device compress the frame, or
+            CaptureMode.RAW to transfer the uncompressed framebuffer (faster
+            over USB, larger over Wi-Fi).
+        fallback_size: Device (width, height) used for the fallback image.
+            Defaults to 1080x2400 when unknown.
 
     Returns:
-        Screenshot object containing base64 data and dimensions.
+        Screenshot object containing the image data and dimensions.
 
     Note:
         If the screenshot fails (e.g., on sensitive screens like payment pages),
         a black fallback image is returned with is_sensitive=True.
     """
-    temp_path = os.path.join(tempfile.gettempdir(), f"screenshot_{uuid.uuid4()}.png")
-    adb_prefix = _get_adb_prefix(device_id)
+    command = ["screencap"]
+    if mode == CaptureMode.PNG:
+        command.append("-p")
 
     try:
-        # Execute screenshot command
-        result = subprocess.run(
-            adb_prefix + ["shell", "screencap", "-p", "/sdcard/tmp.png"],
-            capture_output=True,
-            text=True,
-            timeout=timeout,
-        )
-
-        # Check for screenshot failure (sensitive screen)
-        output = result.stdout + result.stderr
-        if "Status: -1" in output or "Failed" in output:
-            return _create_fallback_screenshot(is_sensitive=True)
-
-        # Pull screenshot to local temp path
-        subprocess.run(
-            adb_prefix + ["pull", "/sdcard/tmp.png", temp_path],
-            capture_output=True,
-            text=True,
-            timeout=5,
-        )
-
-        if not os.path.exists(temp_path):
-            return _create_fallback_screenshot(is_sensitive=False)
-
-        # Read and encode image
-        img = Image.open(temp_path)
-        width, height = img.size
-
-        buffered = BytesIO()
-        img.save(buffered, format="PNG")
-        base64_data = base64.b64encode(buffered.getvalue()).decode("utf-8")
-
-        # Cleanup
-        os.remove(temp_path)
-
-        return Screenshot(
-            base64_data=base64_data, width=width, height=height, is_sensitive=False
-        )
+        data = _exec_out(command, device_id, timeout)
+
+        if mode == CaptureMode.RAW:
+            screenshot = _parse_raw_screencap(data)
+        elif data.startswith(PNG_SIGNATURE):
+            screenshot = _parse_png_screencap(data)
+        else:
+            screenshot = None
+
+        if screenshot is None:
+            # Check for screenshot failure (sensitive screen)
+            output = data[:256].decode("utf-8", errors="ignore")
+            if "Status: -1" in output or "Failed" in output:
+                return _create_fallback_screenshot(True, fallback_size)
+            return _create_fallback_screenshot(False, fallback_size)
+
+        return screenshot
 
     except Exception as e:
         print(f"Screenshot error: {e}")
-        return _create_fallback_screenshot(is_sensitive=False)
+        return _create_fallback_screenshot(False, fallback_size)
+
+
+def _parse_png_screencap(data: bytes) -> Screenshot:
+    """
+    Build a Screenshot from `screencap -p` output.
+
+    The PNG bytes are passed through untouched; the dimensions are read from
+    the IHDR chunk, so the image is never decoded unless a consumer asks for
+    pixels.
+    """
+    if data[12:16] == b"IHDR":
+        width = int.from_bytes(data[16:20], "big")
+        height = int.from_bytes(data[20:24], "big")
+    else:
+        width, height = Image.open(BytesIO(data)).size
+
+    return Screenshot(width=width, height=height, png_data=data)
+
+
+def _parse_raw_screencap(data: bytes) -> Screenshot | None:
+    """
+    Build a Screenshot from raw `screencap` output.
+
+    The raw dump starts with little-endian uint32 width, height and pixel
+    format, followed on Android 9+ by a uint32 color space, then the pixels.
+
+    Returns:
+        Screenshot, or None if the data is not a supported raw dump.
+    """
+    if len(data) < 12:
+        return None
+
+    width = int.from_bytes(data[0:4], "little")
+    height = int.from_bytes(data[4:8], "little")
+    pixel_format = int.from_bytes(data[8:12], "little")
+
+    bytes_per_pixel = _RAW_FORMATS.get(pixel_format)
+    if bytes_per_pixel is None or width == 0 or height == 0:
+        return None
+
+    pixel_size = width * height * bytes_per_pixel
+    header_size = len(data) - pixel_size
+    if header_size not in (12, 16):
+        return None
+
+    pixels = np.frombuffer(data, dtype=np.uint8, count=pixel_size, offset=header_size)
+    pixels = pixels.reshape(height, width, bytes_per_pixel)
+    if pixel_format == 5:
+        pixels = pixels[:, :, [2, 1, 0, 3]]
+
+    return Screenshot(width=width, height=height, pixels=pixels)
+
+
+def _exec_out(command: list[str], device_id: str | None, timeout: int) -> bytes:
+    """Run a command and return its stdout, or its stderr if stdout is empty."""
+    try:
+        return get_client().exec_out(command, device_id, timeout)
+    except ADBError:
+        pass
+
+    result = subprocess.run(
+        _get_adb_prefix(device_id) + ["exec-out"] + command,
+        capture_output=True,
+        timeout=timeout,
+    )
+    return result.stdout or result.stderr
 
 
 def _get_adb_prefix(device_id: str | None) -> list:
@@ -92,18 +209,27 @@ def _get_adb_prefix(device_id: str | None) -> list:
     return ["adb"]
 
 
-def _create_fallback_screenshot(is_sensitive: bool) -> Screenshot:
+def _create_fallback_screenshot(
+    is_sensitive: bool, size: Tuple[int, int] | None = None
+) -> Screenshot:
     """Create a black fallback image when screenshot fails."""
-    default_width, default_height = 1080, 2400
+    width, height = size or DEFAULT_SCREEN_SIZE
+    return replace(_fallback_template(width, height, is_sensitive))
+
 
-    black_img = Image.new("RGB", (default_width, default_height), color="black")
+@functools.lru_cache(maxsize=16)
+def _fallback_template(width: int, height: int, is_sensitive: bool) -> Screenshot:
+    """Build and encode the fallback image once per size and sensitivity."""
+    black_img = Image.new("RGB", (width, height), color="black")
     buffered = BytesIO()
     black_img.save(buffered, format="PNG")
-    base64_data = base64.b64encode(buffered.getvalue()).decode("utf-8")
 
-    return Screenshot(
-        base64_data=base64_data,
-        width=default_width,
-        height=default_height,
+    screenshot = Screenshot(
+        width=width,
+        height=height,
         is_sensitive=is_sensitive,
+        png_data=buffered.getvalue(),
     )
+    # Precompute base64 so copies of the template share it
+    screenshot.base64_data
+    return screenshot
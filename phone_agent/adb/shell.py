@@ -0,0 +1,325 @@
+"""Persistent ADB shell sessions for low-latency device commands."""
+
+import atexit
+import queue
+import shlex
+import socket
+import subprocess
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Iterator
+
+from phone_agent.adb.client import ADBClient, ADBError, get_client
+
+
+class ShellSessionError(Exception):
+    """
+    Raised when a shell session dies or stops responding.
+
+    Attributes:
+        command_sent: Whether the command may already have reached the
+            device, in which case it must not be retried blindly.
+    """
+
+    def __init__(self, message: str, command_sent: bool = False):
+        super().__init__(message)
+        self.command_sent = command_sent
+
+
+class ShellSession:
+    """
+    A long-lived device shell that runs commands one at a time.
+
+    The shell is opened directly on the ADB server socket when a client is
+    given, otherwise as an `adb shell -T` process. Each command is followed
+    by an `echo` of a unique marker and the exit status, which frames its
+    output on the shared stdout stream.
+
+    Args:
+        device_id: Optional ADB device ID.
+        adb_path: Path to ADB executable.
+        client: ADB server client. None spawns an adb process instead.
+    """
+
+    def __init__(
+        self,
+        device_id: str | None = None,
+        adb_path: str = "adb",
+        client: ADBClient | None = None,
+    ):
+        self.device_id = device_id
+        self._marker = f"__PA_{uuid.uuid4().hex}__"
+        self._lines: queue.Queue[str | None] = queue.Queue()
+        self._eof = threading.Event()
+        self._process: subprocess.Popen | None = None
+        self._socket: socket.socket | None = None
+
+        if client is not None:
+            self._socket = client.open_shell(device_id)
+            self._socket.settimeout(None)
+            self._stdin = self._socket.makefile("w", encoding="utf-8")
+            self._stdout = self._socket.makefile(
+                "r", encoding="utf-8", errors="replace"
+            )
+        else:
+            cmd = [adb_path]
+            if device_id:
+                cmd.extend(["-s", device_id])
+            cmd.extend(["shell", "-T"])
+
+            self._process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                bufsize=1,
+            )
+            self._stdin = self._process.stdin
+            self._stdout = self._process.stdout
+
+        self._reader = threading.Thread(target=self._read_lines, daemon=True)
+        self._reader.start()
+
+    def _read_lines(self) -> None:
+        """Pump stdout lines into the queue until the shell exits."""
+        try:
+            for line in self._stdout:
+                self._lines.put(line)
+        except (OSError, ValueError):
+            pass
+        self._eof.set()
+        self._lines.put(None)
+
+    @property
+    def alive(self) -> bool:
+        """Whether the underlying shell is still running."""
+        if self._eof.is_set():
+            return False
+        return self._process is None or self._process.poll() is None
+
+    def run(self, args: list[str], timeout: float = 10) -> tuple[int, str]:
+        """
+        Run a command in the session.
+
+        Args:
+            args: Command and arguments, quoted for the device shell.
+            timeout: Seconds to wait for the command to complete.
+
+        Returns:
+            Tuple of (exit status, combined stdout/stderr).
+
+        Raises:
+            ShellSessionError: If the session died or timed out. The session
+                must not be reused afterwards.
+        """
+        if not self.alive:
+            raise ShellSessionError("adb shell session is not running")
+
+        command = f"{shlex.join(args)} </dev/null 2>&1; echo {self._marker}$?\n"
+        try:
+            self._stdin.write(command)
+            self._stdin.flush()
+        except OSError as e:
+            raise ShellSessionError(f"adb shell session closed: {e}")
+
+        output = []
+        while True:
+            try:
+                line = self._lines.get(timeout=timeout)
+            except queue.Empty:
+                raise ShellSessionError(
+                    f"Command timed out after {timeout}s", command_sent=True
+                )
+            if line is None:
+                raise ShellSessionError("adb shell session exited", command_sent=True)
+
+            index = line.find(self._marker)
+            if index == -1:
+                output.append(line)
+                continue
+
+            # Output without a trailing newline shares the marker line
+            output.append(line[:index])
+            status = line[index + len(self._marker) :].strip()
+            return int(status) if status.isdigit() else -1, "".join(output)
+
+    def close(self) -> None:
+        """Terminate the session."""
+        try:
+            self._stdin.close()
+        except OSError:
+            pass
+
+        if self._socket is not None:
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._socket.close()
+            return
+
+        try:
+            self._process.terminate()
+            self._process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+        except Exception:
+            pass
+
+
+class ShellSessionPool:
+    """
+    Per-device pool of reusable shell sessions.
+
+    Sessions are created on demand, up to max_sessions idle sessions are
+    kept per device, and broken sessions are discarded. New sessions are
+    opened on the ADB server socket, falling back to an adb process.
+
+    Args:
+        max_sessions: Maximum idle sessions kept per device.
+        adb_path: Path to ADB executable.
+        client: ADB server client. None always uses adb processes.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 2,
+        adb_path: str = "adb",
+        client: ADBClient | None = None,
+    ):
+        self.max_sessions = max_sessions
+        self.adb_path = adb_path
+        self.client = client
+        self._idle: dict[str | None, list[ShellSession]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def session(self, device_id: str | None = None) -> Iterator[ShellSession]:
+        """Borrow a session for a device, returning it to the pool afterwards."""
+        session = None
+        with self._lock:
+            idle = self._idle.get(device_id, [])
+            while idle and session is None:
+                candidate = idle.pop()
+                if candidate.alive:
+                    session = candidate
+                else:
+                    candidate.close()
+
+        if session is None:
+            session = self._open(device_id)
+
+        returned = False
+        try:
+            yield session
+        except ShellSessionError:
+            # The output stream may be out of step with the commands
+            raise
+        else:
+            with self._lock:
+                idle = self._idle.setdefault(device_id, [])
+                if session.alive and len(idle) < self.max_sessions:
+                    idle.append(session)
+                    returned = True
+        finally:
+            # Any error in the caller, even KeyboardInterrupt, discards the
+            # session so its socket or adb process and reader thread end
+            if not returned:
+                session.close()
+
+    def _open(self, device_id: str | None) -> ShellSession:
+        """Open a new session, preferring the ADB server socket."""
+        if self.client is not None:
+            try:
+                return ShellSession(device_id, client=self.client)
+            except (ADBError, OSError):
+                pass
+        return ShellSession(device_id, self.adb_path)
+
+    def run(
+        self, args: list[str], device_id: str | None = None, timeout: float = 10
+    ) -> tuple[int, str]:
+        """Run a command on a pooled session. See ShellSession.run."""
+        with self.session(device_id) as session:
+            return session.run(args, timeout)
+
+    def close(self, device_id: str | None = None) -> None:
+        """Close idle sessions for one device, or for all devices if None."""
+        with self._lock:
+            if device_id is None:
+                sessions = [s for idle in self._idle.values() for s in idle]
+                self._idle.clear()
+            else:
+                sessions = self._idle.pop(device_id, [])
+        for session in sessions:
+            session.close()
+
+
+_pool = ShellSessionPool(client=get_client())
+_pool_enabled = True
+atexit.register(_pool.close)
+
+
+def use_shell_pool(enabled: bool) -> None:
+    """
+    Enable or disable the persistent shell pool for device commands.
+
+    When disabled, every command opens its own shell connection.
+    """
+    global _pool_enabled
+    _pool_enabled = enabled
+    if not enabled:
+        _pool.close()
+
+
+def run_shell(
+    args: list[str], device_id: str | None = None, timeout: float = 10
+) -> str:
+    """
+    Run a shell command on the device and return its output.
+
+    Uses a pooled persistent session when available, falling back to a
+    one-off shell over the ADB server socket, then to an `adb shell`
+    process, if the session cannot be used. A command that was already
+    sent is never re-run, so input events are not doubled.
+
+    Args:
+        args: Command and arguments.
+        device_id: Optional ADB device ID.
+        timeout: Timeout in seconds.
+
+    Returns:
+        Combined stdout/stderr of the command.
+
+    Raises:
+        ShellSessionError: If a pooled command was sent but did not complete.
+    """
+    if _pool_enabled:
+        try:
+            return _pool.run(args, device_id, timeout)[1]
+        except ShellSessionError as e:
+            if e.command_sent:
+                raise
+        except OSError:
+            pass
+
+    try:
+        return get_client().shell(args, device_id, timeout)
+    except ADBError:
+        pass
+
+    # adb joins shell arguments with spaces, so quote them like the socket path
+    adb_prefix = ["adb", "-s", device_id] if device_id else ["adb"]
+    result = subprocess.run(
+        adb_prefix + ["shell", shlex.join(args)],
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+        timeout=timeout,
+    )
+    return result.stdout + result.stderr
@@ -1,31 +1,105 @@
 """Main PhoneAgent class for orchestrating phone automation."""
 
+import asyncio
 import json
+import time
 import traceback
-from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from typing import Any, Callable
 
 from phone_agent.actions import ActionHandler
 from phone_agent.actions.handler import do, finish, parse_action
-from phone_agent.adb import get_current_app, get_screenshot
+from phone_agent.adb import (
+    CaptureMode,
+    Screenshot,
+    TextInputMode,
+    get_current_app,
+    get_screenshot,
+    take_wait_time,
+)
 from phone_agent.config import get_messages, get_system_prompt
-from phone_agent.model import ModelClient, ModelConfig
-from phone_agent.model.client import MessageBuilder
+from phone_agent.context import ContextPolicy, compact_context, estimate_tokens
+from phone_agent.model import AsyncModelClient, ModelClient, ModelConfig, ModelUsage
+from phone_agent.model.client import MessageBuilder, ModelResponse
+from phone_agent.model.image import preprocess_image
+
+# Default context budget with prefix_cache: about 7 full-resolution phone
+# screenshots, leaving room for the next screenshot and the response in a
+# 32k context window
+PREFIX_CACHE_MAX_TOKENS = 24_000
 
 
 @dataclass
 class AgentConfig:
-    """Configuration for the PhoneAgent."""
+    """
+    Configuration for the PhoneAgent.
+
+    With prefix_cache enabled, the context is append-only: screenshots are
+    kept in earlier messages instead of being stripped, so every request
+    shares a byte-identical prefix with the previous one and the model
+    server's prefix cache can reuse it. The context_policy then only runs
+    once its max_tokens budget is exceeded, and shrinks the context to half
+    the budget so the prefix stays stable for several steps afterwards.
+    Without a context_policy, ContextPolicy(max_tokens=PREFIX_CACHE_MAX_TOKENS)
+    is used; a policy without max_tokens is rejected, since the kept
+    screenshots would otherwise grow the context without limit.
+
+    With pipeline enabled, the screenshot and the foreground-app lookup run
+    concurrently, actions wait for the UI to settle instead of sleeping
+    (as with settle_ui), and the next step's capture starts in the
+    background as soon as the action has settled.
+
+    With batch_actions enabled, the system prompt allows several do(...)
+    calls per answer; they run back to back with settle detection in
+    between (see ActionHandler).
+    """
 
     max_steps: int = 100
     device_id: str | None = None
     lang: str = "cn"
     system_prompt: str | None = None
     verbose: bool = True
+    capture_mode: CaptureMode = CaptureMode.PNG
+    screen_size: tuple[int, int] | None = None
+    settle_ui: bool = False
+    context_policy: ContextPolicy | None = None
+    prefix_cache: bool = False
+    pipeline: bool = False
+    batch_actions: bool = False
+    text_input: TextInputMode = TextInputMode.BROADCAST
 
     def __post_init__(self):
         if self.system_prompt is None:
-            self.system_prompt = get_system_prompt(self.lang)
+            self.system_prompt = get_system_prompt(self.lang, self.batch_actions)
+        if self.prefix_cache:
+            if self.context_policy is None:
+                self.context_policy = ContextPolicy(max_tokens=PREFIX_CACHE_MAX_TOKENS)
+            elif self.context_policy.max_tokens is None:
+                raise ValueError("prefix_cache requires context_policy.max_tokens")
+
+
+@dataclass
+class StepTimings:
+    """
+    Wall-clock seconds spent in each stage of an agent step.
+
+    screenshot and current_app are the ADB round trips themselves, while
+    capture_wait is how long the step actually blocked on them (less when
+    the capture was prefetched in pipeline mode). model_ttft is only known
+    for streamed responses. action excludes the post-action settle wait.
+    """
+
+    screenshot: float = 0.0
+    current_app: float = 0.0
+    capture_wait: float = 0.0
+    encode: float = 0.0
+    model_ttft: float | None = None
+    model_total: float = 0.0
+    parse: float = 0.0
+    action: float = 0.0
+    settle: float = 0.0
+    total: float = 0.0
 
 
 @dataclass
@@ -37,6 +111,10 @@ class StepResult:
     action: dict[str, Any] | None
     thinking: str
     message: str | None = None
+    context_tokens: int = 0
+    tokens_saved: int = 0
+    usage: ModelUsage | None = None
+    timings: StepTimings = field(default_factory=StepTimings)
 
 
 class PhoneAgent:
@@ -51,6 +129,10 @@ class PhoneAgent:
         agent_config: Configuration for the agent behavior.
         confirmation_callback: Optional callback for sensitive action confirmation.
         takeover_callback: Optional callback for takeover requests.
+        thinking_callback: Optional callback receiving thinking text deltas
+            while the model response streams (requires ModelConfig.stream).
+        timing_callback: Optional callback receiving the step number and
+            StepTimings after every step.
 
     Example:
         >>> from phone_agent import PhoneAgent
@@ -67,19 +149,30 @@ class PhoneAgent:
         agent_config: AgentConfig | None = None,
         confirmation_callback: Callable[[str], bool] | None = None,
         takeover_callback: Callable[[str], None] | None = None,
+        thinking_callback: Callable[[str], None] | None = None,
+        timing_callback: Callable[[int, StepTimings], None] | None = None,
     ):
         self.model_config = model_config or ModelConfig()
+        self.thinking_callback = thinking_callback
+        self.timing_callback = timing_callback
         self.agent_config = agent_config or AgentConfig()
 
         self.model_client = ModelClient(self.model_config)
+        self._async_model_client: AsyncModelClient | None = None
         self.action_handler = ActionHandler(
             device_id=self.agent_config.device_id,
             confirmation_callback=confirmation_callback,
             takeover_callback=takeover_callback,
+            settle=self.agent_config.settle_ui or self.agent_config.pipeline,
+            text_input=self.agent_config.text_input,
         )
 
         self._context: list[dict[str, Any]] = []
         self._step_count = 0
+        self._timings = StepTimings()
+        self._step_start = 0.0
+        self._executor: ThreadPoolExecutor | None = None
+        self._prefetch: Future | None = None
 
     def run(self, task: str) -> str:
         """
@@ -91,23 +184,25 @@ class PhoneAgent:
         Returns:
             Final message from the agent.
         """
-        self._context = []
-        self._step_count = 0
-
-        # First step with user prompt
-        result = self._execute_step(task, is_first=True)
-
-        if result.finished:
-            return result.message or "Task completed"
+        self.reset()
 
-        # Continue until finished or max steps reached
-        while self._step_count < self.agent_config.max_steps:
-            result = self._execute_step(is_first=False)
+        try:
+            # First step with user prompt
+            result = self._execute_step(task, is_first=True)
 
             if result.finished:
                 return result.message or "Task completed"
 
-        return "Max steps reached"
+            # Continue until finished or max steps reached
+            while self._step_count < self.agent_config.max_steps:
+                result = self._execute_step(is_first=False)
+
+                if result.finished:
+                    return result.message or "Task completed"
+
+            return "Max steps reached"
+        finally:
+            self.restore_ime()
 
     def step(self, task: str | None = None) -> StepResult:
         """
@@ -128,20 +223,155 @@ class PhoneAgent:
 
         return self._execute_step(task, is_first)
 
+    async def arun(self, task: str) -> str:
+        """
+        Run the agent to complete a task without blocking the event loop.
+
+        The model is queried through AsyncModelClient on the shared HTTP
+        pool; only the short ADB operations run in worker threads.
+
+        Args:
+            task: Natural language description of the task.
+
+        Returns:
+            Final message from the agent.
+        """
+        self.reset()
+
+        try:
+            result = await self._aexecute_step(task, is_first=True)
+
+            if result.finished:
+                return result.message or "Task completed"
+
+            while self._step_count < self.agent_config.max_steps:
+                result = await self._aexecute_step(is_first=False)
+
+                if result.finished:
+                    return result.message or "Task completed"
+
+            return "Max steps reached"
+        finally:
+            # Also runs on errors and cancellation
+            await asyncio.to_thread(self.restore_ime)
+
+    async def astep(self, task: str | None = None) -> StepResult:
+        """
+        Execute a single step of the agent asynchronously. See step().
+
+        Args:
+            task: Task description (only needed for first step).
+
+        Returns:
+            StepResult with step details.
+        """
+        is_first = len(self._context) == 0
+
+        if is_first and not task:
+            raise ValueError("Task is required for the first step")
+
+        return await self._aexecute_step(task, is_first)
+
+    @property
+    def async_model_client(self) -> AsyncModelClient:
+        """Async model client, created on first use."""
+        if self._async_model_client is None:
+            self._async_model_client = AsyncModelClient(self.model_config)
+        return self._async_model_client
+
     def reset(self) -> None:
         """Reset the agent state for a new task."""
         self._context = []
         self._step_count = 0
+        self._discard_prefetch()
+        self.restore_ime()
+
+    def close(self) -> None:
+        """
+        Release the agent's worker threads and restore the keyboard.
+
+        Cancels a pending background capture. The agent can still be used
+        afterwards; worker threads are created again when needed.
+        """
+        self._discard_prefetch()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self.restore_ime()
+
+    def restore_ime(self) -> None:
+        """
+        Restore the keyboard that was active before the task's first Type.
+
+        run() and arun() call this on every exit. Callers that drive the
+        agent with step() or astep() should call it when they stop, including
+        on errors and cancellation. Does nothing if no Type action ran.
+        """
+        self.action_handler.restore_ime()
 
     def _execute_step(
         self, user_prompt: str | None = None, is_first: bool = False
     ) -> StepResult:
         """Execute a single step of the agent loop."""
+        screenshot = self._prepare_step(user_prompt, is_first)
+
+        # Get model response
+        start = time.perf_counter()
+        try:
+            response = self.model_client.request(
+                self._context,
+                thinking_callback=self.thinking_callback,
+                batch_actions=self.agent_config.batch_actions,
+            )
+        except Exception as e:
+            self._timings.model_total = time.perf_counter() - start
+            result = self._model_error(e)
+            self.action_handler.restore_ime()
+            return result
+        self._timings.model_total = time.perf_counter() - start
+        self._timings.model_ttft = response.time_to_first_token
+
+        return self._complete_step(response, screenshot)
+
+    async def _aexecute_step(
+        self, user_prompt: str | None = None, is_first: bool = False
+    ) -> StepResult:
+        """Execute a single step of the agent loop asynchronously."""
+        screenshot = await asyncio.to_thread(self._prepare_step, user_prompt, is_first)
+
+        start = time.perf_counter()
+        try:
+            response = await self.async_model_client.request(
+                self._context,
+                thinking_callback=self.thinking_callback,
+                batch_actions=self.agent_config.batch_actions,
+            )
+        except Exception as e:
+            self._timings.model_total = time.perf_counter() - start
+            result = self._model_error(e)
+            await asyncio.to_thread(self.action_handler.restore_ime)
+            return result
+        self._timings.model_total = time.perf_counter() - start
+        self._timings.model_ttft = response.time_to_first_token
+
+        return await asyncio.to_thread(self._complete_step, response, screenshot)
+
+    def _prepare_step(self, user_prompt: str | None, is_first: bool) -> Screenshot:
+        """Capture the screen and append the user message for a new step."""
         self._step_count += 1
+        self._step_start = time.perf_counter()
 
         # Capture current screen state
-        screenshot = get_screenshot(self.agent_config.device_id)
-        current_app = get_current_app(self.agent_config.device_id)
+        if self._prefetch is not None:
+            screenshot, current_app, self._timings = self._prefetch.result()
+            self._prefetch = None
+        else:
+            screenshot, current_app, self._timings = self._capture()
+        self._timings.capture_wait = time.perf_counter() - self._step_start
+
+        start = time.perf_counter()
+        image_base64, mime_type = preprocess_image(screenshot, self.model_config.image)
+        self._timings.encode = time.perf_counter() - start
 
         # Build messages
         if is_first:
@@ -154,7 +384,7 @@ class PhoneAgent:
 
             self._context.append(
                 MessageBuilder.create_user_message(
-                    text=text_content, image_base64=screenshot.base64_data
+                    text=text_content, image_base64=image_base64, mime_type=mime_type
                 )
             )
         else:
@@ -163,31 +393,38 @@ class PhoneAgent:
 
             self._context.append(
                 MessageBuilder.create_user_message(
-                    text=text_content, image_base64=screenshot.base64_data
+                    text=text_content, image_base64=image_base64, mime_type=mime_type
                 )
             )
 
-        # Get model response
-        try:
-            response = self.model_client.request(self._context)
-        except Exception as e:
-            if self.agent_config.verbose:
-                traceback.print_exc()
-            return StepResult(
-                success=False,
-                finished=True,
-                action=None,
-                thinking="",
-                message=f"Model error: {e}",
-            )
+        return screenshot
 
+    def _model_error(self, error: Exception) -> StepResult:
+        """Build the result of a step whose model request failed."""
+        if self.agent_config.verbose:
+            traceback.print_exc()
+        return StepResult(
+            success=False,
+            finished=True,
+            action=None,
+            thinking="",
+            message=f"Model error: {error}",
+            timings=self._finish_timings(),
+        )
+
+    def _complete_step(
+        self, response: ModelResponse, screenshot: Screenshot
+    ) -> StepResult:
+        """Parse and execute the model's action and record it in the context."""
         # Parse action from response
+        start = time.perf_counter()
         try:
             action = parse_action(response.action)
         except ValueError:
             if self.agent_config.verbose:
                 traceback.print_exc()
             action = finish(message=response.action)
+        self._timings.parse = time.perf_counter() - start
 
         if self.agent_config.verbose:
             # Print thinking process
@@ -201,10 +438,15 @@ class PhoneAgent:
             print(json.dumps(action, ensure_ascii=False, indent=2))
             print("=" * 50 + "\n")
 
-        # Remove image from context to save space
-        self._context[-1] = MessageBuilder.remove_images_from_message(self._context[-1])
+        # Remove image from context to save space (this rewrites the prefix)
+        if not self.agent_config.prefix_cache:
+            self._context[-1] = MessageBuilder.remove_images_from_message(
+                self._context[-1]
+            )
 
         # Execute action
+        take_wait_time()
+        start = time.perf_counter()
         try:
             result = self.action_handler.execute(
                 action, screenshot.width, screenshot.height
@@ -215,6 +457,8 @@ class PhoneAgent:
             result = self.action_handler.execute(
                 finish(message=str(e)), screenshot.width, screenshot.height
             )
+        self._timings.settle = take_wait_time()
+        self._timings.action = time.perf_counter() - start - self._timings.settle
 
         # Add assistant response to context
         self._context.append(
@@ -223,8 +467,17 @@ class PhoneAgent:
             )
         )
 
+        # Compact older turns so the context stays bounded
+        context_tokens, tokens_saved = self._compact_context()
+
         # Check if finished
         finished = action.get("_metadata") == "finish" or result.should_finish
+        if finished:
+            self.action_handler.restore_ime()
+
+        # The action has settled: start capturing the next screen right away
+        if self.agent_config.pipeline and not finished:
+            self._prefetch = self._get_executor().submit(self._capture)
 
         if finished and self.agent_config.verbose:
             msgs = get_messages(self.agent_config.lang)
@@ -240,8 +493,96 @@ class PhoneAgent:
             action=action,
             thinking=response.thinking,
             message=result.message or action.get("message"),
+            context_tokens=context_tokens,
+            tokens_saved=tokens_saved,
+            usage=response.usage,
+            timings=self._finish_timings(),
         )
 
+    def _finish_timings(self) -> StepTimings:
+        """Close the current step's timings and report them to the hook."""
+        timings = self._timings
+        timings.total = time.perf_counter() - self._step_start
+        self._timings = StepTimings()
+        if self.timing_callback:
+            self.timing_callback(self._step_count, timings)
+        return timings
+
+    def _capture(self) -> tuple[Screenshot, str, StepTimings]:
+        """
+        Capture the screenshot and the foreground app.
+
+        In pipeline mode the two ADB round trips run concurrently.
+
+        Returns:
+            Tuple of (screenshot, current app name, timings of both stages).
+        """
+        timings = StepTimings()
+
+        def screenshot_stage() -> Screenshot:
+            start = time.perf_counter()
+            screenshot = get_screenshot(
+                self.agent_config.device_id,
+                mode=self.agent_config.capture_mode,
+                fallback_size=self.agent_config.screen_size,
+            )
+            timings.screenshot = time.perf_counter() - start
+            return screenshot
+
+        def current_app_stage() -> str:
+            start = time.perf_counter()
+            current_app = get_current_app(self.agent_config.device_id)
+            timings.current_app = time.perf_counter() - start
+            return current_app
+
+        if self.agent_config.pipeline:
+            pending = self._get_executor().submit(screenshot_stage)
+            current_app = current_app_stage()
+            screenshot = pending.result()
+        else:
+            screenshot = screenshot_stage()
+            current_app = current_app_stage()
+
+        return screenshot, current_app, timings
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Worker threads for pipelined capture, created on first use."""
+        if self._executor is None:
+            # One worker for a background capture, one for its screenshot
+            self._executor = ThreadPoolExecutor(
+                max_workers=2, thread_name_prefix="phone-agent"
+            )
+        return self._executor
+
+    def _discard_prefetch(self) -> None:
+        """Drop a background capture that will not be used."""
+        if self._prefetch is not None:
+            self._prefetch.cancel()
+            self._prefetch = None
+
+    def _compact_context(self) -> tuple[int, int]:
+        """
+        Apply the context policy.
+
+        Returns:
+            Tuple of (estimated context tokens, estimated tokens saved).
+        """
+        policy = self.agent_config.context_policy
+        if policy is None:
+            return estimate_tokens(self._context), 0
+
+        if self.agent_config.prefix_cache:
+            # Leave the prefix untouched until the budget is exceeded
+            context_tokens = estimate_tokens(self._context, policy.image_tokens)
+            if context_tokens <= policy.max_tokens:
+                return context_tokens, 0
+            stats = compact_context(
+                self._context, policy, target_tokens=policy.max_tokens // 2
+            )
+        else:
+            stats = compact_context(self._context, policy)
+        return stats.tokens_after, stats.tokens_saved
+
     @property
     def context(self) -> list[dict[str, Any]]:
         """Get the current conversation context."""
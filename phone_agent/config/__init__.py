@@ -2,23 +2,26 @@
 
 from phone_agent.config.apps import APP_PACKAGES
 from phone_agent.config.i18n import get_message, get_messages
+from phone_agent.config.prompts_en import BATCH_ACTIONS_PROMPT as BATCH_PROMPT_EN
 from phone_agent.config.prompts_en import SYSTEM_PROMPT as SYSTEM_PROMPT_EN
+from phone_agent.config.prompts_zh import BATCH_ACTIONS_PROMPT as BATCH_PROMPT_ZH
 from phone_agent.config.prompts_zh import SYSTEM_PROMPT as SYSTEM_PROMPT_ZH
 
 
-def get_system_prompt(lang: str = "cn") -> str:
+def get_system_prompt(lang: str = "cn", batch_actions: bool = False) -> str:
     """
     Get system prompt by language.
 
     Args:
         lang: Language code, 'cn' for Chinese, 'en' for English.
+        batch_actions: Also describe the batched multi-action answer form.
 
     Returns:
         System prompt string.
     """
     if lang == "en":
-        return SYSTEM_PROMPT_EN
-    return SYSTEM_PROMPT_ZH
+        return SYSTEM_PROMPT_EN + (BATCH_PROMPT_EN if batch_actions else "")
+    return SYSTEM_PROMPT_ZH + (BATCH_PROMPT_ZH if batch_actions else "")
 
 
 # Default to Chinese for backward compatibility
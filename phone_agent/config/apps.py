@@ -1,5 +1,9 @@
 """App name to package name mapping for supported applications."""
 
+import re
+from types import MappingProxyType
+from typing import Mapping
+
 APP_PACKAGES: dict[str, str] = {
     # Social & Messaging
     "微信": "com.tencent.mm",
@@ -188,6 +192,40 @@ APP_PACKAGES: dict[str, str] = {
 }
 
 
+def _build_indexes(
+    app_packages: Mapping[str, str],
+) -> tuple[Mapping[str, str], Mapping[str, tuple[str, ...]], frozenset[str]]:
+    """
+    Build the immutable lookup indexes for an app -> package mapping.
+
+    Returns:
+        Tuple of (app -> package, package -> display names in declaration
+        order, proper dotted prefixes of all known packages).
+    """
+    app_to_package = MappingProxyType(dict(app_packages))
+
+    names: dict[str, list[str]] = {}
+    for name, package in app_packages.items():
+        names.setdefault(package, []).append(name)
+    package_to_names = MappingProxyType(
+        {package: tuple(app_names) for package, app_names in names.items()}
+    )
+
+    prefixes = set()
+    for package in package_to_names:
+        parts = package.split(".")
+        for i in range(1, len(parts)):
+            prefixes.add(".".join(parts[:i]))
+
+    return app_to_package, package_to_names, frozenset(prefixes)
+
+
+_APP_TO_PACKAGE, _PACKAGE_TO_NAMES, _PACKAGE_PREFIXES = _build_indexes(APP_PACKAGES)
+
+# Dotted Java identifiers: package names and fully qualified class names
+_DOTTED_NAME_PATTERN = re.compile(r"(?<![\w.])[A-Za-z_]\w*(?:\.\w+)+")
+
+
 def get_package_name(app_name: str) -> str | None:
     """
     Get the package name for an app.
@@ -198,23 +236,70 @@ def get_package_name(app_name: str) -> str | None:
     Returns:
         The Android package name, or None if not found.
     """
-    return APP_PACKAGES.get(app_name)
+    return _APP_TO_PACKAGE.get(app_name)
 
 
 def get_app_name(package_name: str) -> str | None:
     """
     Get the app name from a package name.
 
+    When several display names share a package (e.g. 淘宝 and 淘宝闪购),
+    the one listed first in APP_PACKAGES is returned.
+
     Args:
         package_name: The Android package name.
 
     Returns:
         The display name of the app, or None if not found.
     """
-    for name, package in APP_PACKAGES.items():
-        if package == package_name:
-            return name
-    return None
+    names = _PACKAGE_TO_NAMES.get(package_name)
+    return names[0] if names else None
+
+
+def get_app_names(package_name: str) -> tuple[str, ...]:
+    """
+    Get all display names registered for a package.
+
+    Args:
+        package_name: The Android package name.
+
+    Returns:
+        Display names in APP_PACKAGES order, empty if the package is unknown.
+    """
+    return _PACKAGE_TO_NAMES.get(package_name, ())
+
+
+def find_known_packages(text: str) -> list[str]:
+    """
+    Find known packages mentioned anywhere in a block of text.
+
+    Scans the text once for dotted identifiers and resolves each through a
+    hash lookup, so the cost does not grow with the number of known apps.
+    Class names such as com.tencent.mm.ui.LauncherUI match their package,
+    but a longer package (com.tencent.mmx) never matches a shorter one.
+
+    Args:
+        text: Text to scan, e.g. `dumpsys window` output.
+
+    Returns:
+        Known package names in order of first appearance.
+    """
+    found: dict[str, None] = {}
+    for name in _DOTTED_NAME_PATTERN.findall(text):
+        # Walk the segments while they are a prefix of some known package,
+        # keeping the longest known package seen
+        parts = name.split(".")
+        current = parts[0]
+        match = None
+        for part in parts[1:]:
+            current = f"{current}.{part}"
+            if current in _PACKAGE_TO_NAMES:
+                match = current
+            if current not in _PACKAGE_PREFIXES:
+                break
+        if match:
+            found[match] = None
+    return list(found)
 
 
 def list_supported_apps() -> list[str]:
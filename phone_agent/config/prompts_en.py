@@ -77,3 +77,17 @@ REMEMBER:
 - Generate execution code strictly according to format requirements.
 """
 )
+
+# Appended to SYSTEM_PROMPT when batched actions are enabled
+BATCH_ACTIONS_PROMPT = """
+BATCHED ACTIONS:
+- Exception to the one-line rule: when the next few operations can all be determined from the current screenshot (e.g. tap an input field, type text, tap send), you may return several do(...) lines in one <answer>, in execution order.
+  **Example**:
+  <answer>
+  do(action="Tap", element=[x,y])
+  do(action="Type", text="Hello World")
+  do(action="Tap", element=[x,y])
+  </answer>
+- Each operation waits for the screen to settle before the next one runs. If the foreground app changes unexpectedly, the remaining operations are cancelled and you receive a new screenshot.
+- finish must always be returned on its own. Do not batch sensitive operations.
+"""
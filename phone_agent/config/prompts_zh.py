@@ -75,3 +75,15 @@ SYSTEM_PROMPT = (
 18. 在结束任务前请一定要仔细检查任务是否完整准确的完成，如果出现错选、漏选、多选的情况，请返回之前的步骤进行纠正。
 """
 )
+
+# Appended to SYSTEM_PROMPT when batched actions are enabled
+BATCH_ACTIONS_PROMPT = """
+批量操作：
+如果接下来的几步操作都能根据当前截图确定（例如点击输入框、输入文本、点击发送），可以在 <answer> 中按执行顺序每行写一个 do(...) 指令，一次返回多个操作，例如：
+<answer>
+do(action="Tap", element=[x,y])
+do(action="Type", text="xxx")
+do(action="Tap", element=[x,y])
+</answer>
+每个操作完成后会等待页面稳定再执行下一个。如果前台应用发生了意外变化，剩余操作会被取消，你将收到最新的截图。finish 必须单独返回；涉及敏感操作、Take_over 或 Interact 时不要批量返回。
+"""
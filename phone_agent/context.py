@@ -0,0 +1,209 @@
+"""Conversation context compaction for long-running agent tasks."""
+
+import base64
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from io import BytesIO
+from typing import Any
+
+from PIL import Image
+
+# Side in pixels of the square image area that becomes one visual token:
+# 14-pixel ViT patches merged 2x2, as in the Qwen2-VL and GLM-4V encoders
+IMAGE_PATCH_SIZE = 28
+
+# Tokens of an image whose size cannot be read: a 1080x2400 screenshot
+IMAGE_TOKEN_ESTIMATE = 3354
+
+# Base64 characters decoded to read an image's size from its header
+_IMAGE_HEADER_CHARS = 4096
+
+_THINK_PATTERN = re.compile(r"<think>(.*?)</think>", re.DOTALL)
+_CJK_PATTERN = re.compile("[\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]")
+_TRUNCATION_MARK = "…"
+
+
+@dataclass
+class ContextPolicy:
+    """
+    Policy for keeping the agent's conversation context bounded.
+
+    The system message and the first user message (which carries the task)
+    are always kept. Other turns are compacted oldest first.
+
+    Attributes:
+        keep_last_turns: Number of most recent user/assistant turns kept
+            verbatim. Older turns are subject to max_thinking_chars.
+        max_thinking_chars: Maximum length of the <think> block in older
+            assistant messages; 0 removes the thinking entirely. None keeps
+            it unchanged.
+        max_tokens: Estimated token budget for the whole context. The oldest
+            turns are dropped until the context fits. None disables the cap.
+        image_tokens: Estimated tokens per image. None derives it from each
+            image's pixel size (see estimate_image_tokens).
+    """
+
+    keep_last_turns: int = 4
+    max_thinking_chars: int | None = 200
+    max_tokens: int | None = None
+    image_tokens: int | None = None
+
+
+@dataclass
+class CompactionStats:
+    """Token estimates before and after compacting the context."""
+
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def tokens_saved(self) -> int:
+        """Estimated tokens removed by this compaction."""
+        return self.tokens_before - self.tokens_after
+
+
+def estimate_tokens(
+    messages: list[dict[str, Any]], image_tokens: int | None = None
+) -> int:
+    """
+    Estimate the prompt tokens of a list of messages.
+
+    CJK characters count as one token each and other text as one token per
+    four characters, which is close enough for budgeting. Images are
+    estimated from their pixel size, read from the encoded image header.
+
+    Args:
+        messages: Messages in OpenAI format.
+        image_tokens: Fixed estimate per image instead of the pixel size.
+
+    Returns:
+        Estimated token count.
+    """
+    return sum(_estimate_message_tokens(message, image_tokens) for message in messages)
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """
+    Estimate the visual tokens of an image.
+
+    Each IMAGE_PATCH_SIZE x IMAGE_PATCH_SIZE pixel area is one token, so a
+    1080x2400 screenshot costs about 3.4k tokens and the same screenshot
+    downscaled to ImageConfig(max_side=1024) about 600.
+
+    Args:
+        width: Image width in pixels.
+        height: Image height in pixels.
+
+    Returns:
+        Estimated token count.
+    """
+    return -(-width // IMAGE_PATCH_SIZE) * -(-height // IMAGE_PATCH_SIZE)
+
+
+def compact_context(
+    messages: list[dict[str, Any]],
+    policy: ContextPolicy,
+    target_tokens: int | None = None,
+) -> CompactionStats:
+    """
+    Compact a conversation context in place according to a policy.
+
+    Compaction is idempotent: already truncated thinking is not touched
+    again, so applying it after every step only changes the turn that just
+    aged out of the keep_last_turns window.
+
+    Args:
+        messages: Messages in OpenAI format, modified in place.
+        policy: Compaction policy.
+        target_tokens: Size to shrink to once policy.max_tokens is exceeded.
+            Defaults to policy.max_tokens; a lower target compacts less often.
+
+    Returns:
+        CompactionStats with token estimates before and after.
+    """
+    tokens_before = estimate_tokens(messages, policy.image_tokens)
+
+    # Messages that are never compacted: system prompt and the task message
+    head = 0
+    for index, message in enumerate(messages):
+        if message.get("role") == "user":
+            head = index + 1
+            break
+
+    if policy.max_thinking_chars is not None:
+        keep_from = len(messages) - 2 * max(policy.keep_last_turns, 0)
+        for index in range(head, max(head, keep_from)):
+            message = messages[index]
+            if message.get("role") == "assistant" and isinstance(
+                message.get("content"), str
+            ):
+                message["content"] = _truncate_thinking(
+                    message["content"], policy.max_thinking_chars
+                )
+
+    tokens_after = estimate_tokens(messages, policy.image_tokens)
+    if policy.max_tokens is not None and tokens_after > policy.max_tokens:
+        target = policy.max_tokens if target_tokens is None else target_tokens
+        # Drop whole turns (assistant + user) after the task message,
+        # but never the most recent turn
+        while tokens_after > target and len(messages) - head > 2:
+            dropped = messages[head : head + 2]
+            del messages[head : head + 2]
+            tokens_after -= estimate_tokens(dropped, policy.image_tokens)
+
+    return CompactionStats(tokens_before=tokens_before, tokens_after=tokens_after)
+
+
+def _estimate_message_tokens(
+    message: dict[str, Any], image_tokens: int | None = None
+) -> int:
+    """Estimate the tokens of a single message."""
+    content = message.get("content")
+    if isinstance(content, str):
+        return _estimate_text_tokens(content) + 4
+
+    tokens = 4
+    for item in content or []:
+        if item.get("type") == "text":
+            tokens += _estimate_text_tokens(item.get("text", ""))
+        elif item.get("type") == "image_url":
+            if image_tokens is None:
+                url = item.get("image_url", {}).get("url", "")
+                tokens += _estimate_url_tokens(url[: _IMAGE_HEADER_CHARS + 64])
+            else:
+                tokens += image_tokens
+    return tokens
+
+
+@lru_cache(maxsize=256)
+def _estimate_url_tokens(url_head: str) -> int:
+    """Estimate the tokens of an image from the start of its data URL."""
+    _, _, data = url_head.partition(";base64,")
+    data = data[: _IMAGE_HEADER_CHARS]
+    try:
+        # Image.open only parses the header, which fits in the decoded prefix
+        size = Image.open(BytesIO(base64.b64decode(data[: len(data) // 4 * 4]))).size
+    except Exception:
+        return IMAGE_TOKEN_ESTIMATE
+    return estimate_image_tokens(*size)
+
+
+def _estimate_text_tokens(text: str) -> int:
+    """Estimate the tokens of a text string."""
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _truncate_thinking(content: str, max_chars: int) -> str:
+    """Shorten the <think> block of an assistant message."""
+
+    def shorten(match: re.Match) -> str:
+        thinking = match.group(1)
+        if len(thinking) <= max_chars or thinking.endswith(_TRUNCATION_MARK):
+            return match.group(0)
+        if max_chars == 0:
+            return ""
+        return f"<think>{thinking[:max_chars]}{_TRUNCATION_MARK}</think>"
+
+    return _THINK_PATTERN.sub(shorten, content)
@@ -1,5 +1,20 @@
 """Model client module for AI inference."""
 
-from phone_agent.model.client import ModelClient, ModelConfig
+from phone_agent.model.client import (
+    AsyncModelClient,
+    ModelClient,
+    ModelConfig,
+    ModelUsage,
+    close_shared_http_clients,
+)
+from phone_agent.model.image import ImageConfig, preprocess_image
 
-__all__ = ["ModelClient", "ModelConfig"]
+__all__ = [
+    "ModelClient",
+    "AsyncModelClient",
+    "ModelConfig",
+    "ModelUsage",
+    "close_shared_http_clients",
+    "ImageConfig",
+    "preprocess_image",
+]
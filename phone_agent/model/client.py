@@ -1,10 +1,16 @@
 """Model client for AI inference using OpenAI-compatible API."""
 
+import asyncio
 import json
+import time
+import weakref
 from dataclasses import dataclass, field
-from typing import Any
+from typing import Any, Callable
 
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+from phone_agent.model.image import ImageConfig
 
 
 @dataclass
@@ -19,6 +25,29 @@ class ModelConfig:
     top_p: float = 0.85
     frequency_penalty: float = 0.2
     extra_body: dict[str, Any] = field(default_factory=dict)
+    image: ImageConfig = field(default_factory=ImageConfig)
+    # Connection pool of AsyncModelClient (see get_shared_http_client)
+    max_connections: int = 32
+    keepalive_expiry: float = 60.0
+    # Streamed responses are cut once the action is complete, before the final
+    # chunk that carries usage, so ModelResponse.usage is then None. vLLM sends
+    # usage in every chunk with extra_body={"stream_options": {"include_usage":
+    # True, "continuous_usage_stats": True}}.
+    stream: bool = False
+
+
+@dataclass
+class ModelUsage:
+    """Token usage reported by the model server."""
+
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int = 0
+
+    @property
+    def cache_hit_rate(self) -> float:
+        """Fraction of prompt tokens served from the prefix cache."""
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
 
 
 @dataclass
@@ -28,6 +57,8 @@ class ModelResponse:
     thinking: str
     action: str
     raw_content: str
+    usage: ModelUsage | None = None
+    time_to_first_token: float | None = None
 
 
 class ModelClient:
@@ -42,12 +73,26 @@ class ModelClient:
         self.config = config or ModelConfig()
         self.client = OpenAI(base_url=self.config.base_url, api_key=self.config.api_key)
 
-    def request(self, messages: list[dict[str, Any]]) -> ModelResponse:
+    def request(
+        self,
+        messages: list[dict[str, Any]],
+        thinking_callback: Callable[[str], None] | None = None,
+        batch_actions: bool = False,
+    ) -> ModelResponse:
         """
         Send a request to the model.
 
+        With config.stream enabled, the response is streamed: thinking text
+        is passed to thinking_callback as it arrives, and the request
+        returns as soon as the do(...)/finish(...) call is syntactically
+        complete instead of waiting for the rest of the completion.
+
         Args:
             messages: List of message dictionaries in OpenAI format.
+            thinking_callback: Optional callback receiving thinking text
+                deltas (streaming mode only).
+            batch_actions: Whether the answer may hold several do(...)
+                calls; streaming then waits for the last one.
 
         Returns:
             ModelResponse containing thinking and action.
@@ -55,65 +100,419 @@ class ModelClient:
         Raises:
             ValueError: If the response cannot be parsed.
         """
+        start = time.perf_counter()
         response = self.client.chat.completions.create(
-            messages=messages,
-            model=self.config.model_name,
-            max_tokens=self.config.max_tokens,
-            temperature=self.config.temperature,
-            top_p=self.config.top_p,
-            frequency_penalty=self.config.frequency_penalty,
-            extra_body=self.config.extra_body,
-            stream=False,
+            **_completion_kwargs(self.config, messages)
         )
 
-        raw_content = response.choices[0].message.content
+        if not self.config.stream:
+            return _build_response(
+                response.choices[0].message.content, _parse_usage(response.usage)
+            )
 
-        # Parse thinking and action from response
-        thinking, action = self._parse_response(raw_content)
+        reader = _StreamReader(thinking_callback, start, batch_actions)
+        try:
+            for chunk in response:
+                if reader.add(chunk):
+                    break
+        finally:
+            response.close()
+        return reader.response()
 
-        return ModelResponse(thinking=thinking, action=action, raw_content=raw_content)
 
-    def _parse_response(self, content: str) -> tuple[str, str]:
-        """
-        Parse the model response into thinking and action parts.
+class AsyncModelClient:
+    """
+    Asynchronous client for OpenAI-compatible vision-language models.
+
+    Requests and response parsing match ModelClient. Instances with the
+    same config.max_connections and config.keepalive_expiry share one
+    keep-alive HTTP connection pool per event loop (see
+    get_shared_http_client), so many concurrent agents on a loop reuse a
+    few TLS connections while waiting on the model. Close the pools with
+    close_shared_http_clients() before the loop closes.
 
-        Parsing rules:
-        1. If content contains 'finish(message=', everything before is thinking,
-           everything from 'finish(message=' onwards is action.
-        2. If rule 1 doesn't apply but content contains 'do(action=',
-           everything before is thinking, everything from 'do(action=' onwards is action.
-        3. Fallback: If content contains '<answer>', use legacy parsing with XML tags.
-        4. Otherwise, return empty thinking and full content as action.
+    Args:
+        config: Model configuration.
+        http_client: Optional HTTP client to use instead of the shared pool.
+            It must only be used on one event loop.
+    """
+
+    def __init__(
+        self,
+        config: ModelConfig | None = None,
+        http_client: httpx.AsyncClient | None = None,
+    ):
+        self.config = config or ModelConfig()
+        self._http_client = http_client
+        self._clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, AsyncOpenAI
+        ] = weakref.WeakKeyDictionary()
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """OpenAI client for the running event loop, created on first use."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed():
+            http_client = self._http_client or get_shared_http_client(
+                self.config.max_connections, self.config.keepalive_expiry
+            )
+            client = AsyncOpenAI(
+                base_url=self.config.base_url,
+                api_key=self.config.api_key,
+                http_client=http_client,
+            )
+            self._clients[loop] = client
+        return client
+
+    async def request(
+        self,
+        messages: list[dict[str, Any]],
+        thinking_callback: Callable[[str], None] | None = None,
+        batch_actions: bool = False,
+    ) -> ModelResponse:
+        """
+        Send a request to the model. See ModelClient.request.
 
         Args:
-            content: Raw response content.
+            messages: List of message dictionaries in OpenAI format.
+            thinking_callback: Optional callback receiving thinking text
+                deltas (streaming mode only).
+            batch_actions: Whether the answer may hold several do(...)
+                calls.
 
         Returns:
-            Tuple of (thinking, action).
+            ModelResponse containing thinking and action.
         """
-        # Rule 1: Check for finish(message=
-        if "finish(message=" in content:
-            parts = content.split("finish(message=", 1)
-            thinking = parts[0].strip()
-            action = "finish(message=" + parts[1]
-            return thinking, action
-
-        # Rule 2: Check for do(action=
-        if "do(action=" in content:
-            parts = content.split("do(action=", 1)
-            thinking = parts[0].strip()
-            action = "do(action=" + parts[1]
-            return thinking, action
-
-        # Rule 3: Fallback to legacy XML tag parsing
-        if "<answer>" in content:
-            parts = content.split("<answer>", 1)
-            thinking = parts[0].replace("<think>", "").replace("</think>", "").strip()
-            action = parts[1].replace("</answer>", "").strip()
-            return thinking, action
-
-        # Rule 4: No markers found, return content as action
-        return "", content
+        start = time.perf_counter()
+        response = await self.client.chat.completions.create(
+            **_completion_kwargs(self.config, messages)
+        )
+
+        if not self.config.stream:
+            return _build_response(
+                response.choices[0].message.content, _parse_usage(response.usage)
+            )
+
+        reader = _StreamReader(thinking_callback, start, batch_actions)
+        try:
+            async for chunk in response:
+                if reader.add(chunk):
+                    break
+        finally:
+            await response.close()
+        return reader.response()
+
+
+# event loop -> (max_connections, keepalive_expiry) -> shared HTTP client
+_shared_http_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[tuple[int, float], httpx.AsyncClient]
+] = weakref.WeakKeyDictionary()
+
+
+def get_shared_http_client(
+    max_connections: int = 32, keepalive_expiry: float = 60.0
+) -> httpx.AsyncClient:
+    """
+    Get the HTTP client shared by AsyncModelClient on the running event loop.
+
+    httpx connections are bound to the loop that opened them, so every
+    event loop owns its own pools, one per combination of limits.
+
+    Args:
+        max_connections: Maximum concurrent (and kept-alive) connections.
+        keepalive_expiry: Seconds an idle connection is kept open.
+
+    Returns:
+        The httpx.AsyncClient of the running event loop.
+
+    Raises:
+        RuntimeError: If called outside a running event loop.
+    """
+    clients = _shared_http_clients.setdefault(asyncio.get_running_loop(), {})
+    key = (max_connections, keepalive_expiry)
+    client = clients.get(key)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(600.0, connect=10.0),
+        )
+        clients[key] = client
+    return client
+
+
+async def close_shared_http_clients() -> None:
+    """
+    Close the shared HTTP clients of the running event loop.
+
+    Call this before the loop closes, e.g. on application shutdown, so the
+    kept-alive connections are shut down cleanly. Later requests on the
+    loop open new pools.
+    """
+    clients = _shared_http_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
+
+def _completion_kwargs(
+    config: ModelConfig, messages: list[dict[str, Any]]
+) -> dict[str, Any]:
+    """Arguments for chat.completions.create, shared by both clients."""
+    kwargs = dict(
+        messages=messages,
+        model=config.model_name,
+        max_tokens=config.max_tokens,
+        temperature=config.temperature,
+        top_p=config.top_p,
+        frequency_penalty=config.frequency_penalty,
+        extra_body=config.extra_body,
+        stream=config.stream,
+    )
+    if config.stream:
+        # Streamed responses only report usage when asked to
+        kwargs["stream_options"] = {"include_usage": True}
+    return kwargs
+
+
+class _StreamReader:
+    """
+    Collects a streamed completion until the action call is complete.
+
+    Usage is only sent in the final chunk unless the server streams it
+    continuously (vLLM: stream_options.continuous_usage_stats), so it is
+    None when the stream is cut short at the action.
+
+    Args:
+        thinking_callback: Optional callback receiving thinking deltas.
+        start: time.perf_counter() value when the request was sent.
+        batch_actions: Keep reading while further do(...) calls follow.
+    """
+
+    def __init__(
+        self,
+        thinking_callback: Callable[[str], None] | None,
+        start: float,
+        batch_actions: bool = False,
+    ):
+        self.thinking_callback = thinking_callback
+        self.start = start
+        self.batch_actions = batch_actions
+        self.content = ""
+        self.usage: ModelUsage | None = None
+        self.time_to_first_token: float | None = None
+        self._emitted = 0
+
+    def add(self, chunk: Any) -> bool:
+        """
+        Process one stream chunk.
+
+        Returns:
+            True once the content ends with a complete action call; the
+            rest of the stream is not needed.
+        """
+        if getattr(chunk, "usage", None):
+            self.usage = _parse_usage(chunk.usage)
+        if not chunk.choices:
+            return False
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            return False
+        if self.time_to_first_token is None:
+            self.time_to_first_token = time.perf_counter() - self.start
+        self.content += delta
+
+        if self.thinking_callback:
+            thinking = _streamable_thinking(self.content)
+            if len(thinking) > self._emitted:
+                self.thinking_callback(thinking[self._emitted :])
+                self._emitted = len(thinking)
+
+        action_end = _find_action_end(self.content, self.batch_actions)
+        if action_end is None:
+            return False
+        self.content = self.content[:action_end]
+        return True
+
+    def response(self) -> ModelResponse:
+        """Build the response from the content read so far."""
+        return _build_response(self.content, self.usage, self.time_to_first_token)
+
+
+def _build_response(
+    raw_content: str, usage: ModelUsage | None, ttft: float | None = None
+) -> ModelResponse:
+    """Split raw content into thinking and action and wrap it."""
+    thinking, action = _parse_response(raw_content)
+    return ModelResponse(
+        thinking=thinking,
+        action=action,
+        raw_content=raw_content,
+        usage=usage,
+        time_to_first_token=ttft,
+    )
+
+
+def _parse_response(content: str) -> tuple[str, str]:
+    """
+    Parse the model response into thinking and action parts.
+
+    Parsing rules:
+    1. If content contains 'finish(message=', everything before is thinking,
+       everything from 'finish(message=' onwards is action.
+    2. If rule 1 doesn't apply but content contains 'do(action=',
+       everything before is thinking, everything from 'do(action=' onwards is action.
+       In both cases a closing '</answer>' tag is removed from the action.
+    3. Fallback: If content contains '<answer>', use legacy parsing with XML tags.
+    4. Otherwise, return empty thinking and full content as action.
+
+    Args:
+        content: Raw response content.
+
+    Returns:
+        Tuple of (thinking, action).
+    """
+    # Rule 1: Check for finish(message=
+    if "finish(message=" in content:
+        parts = content.split("finish(message=", 1)
+        thinking = parts[0].strip()
+        action = "finish(message=" + parts[1]
+        return thinking, _strip_answer_end(action)
+
+    # Rule 2: Check for do(action=
+    if "do(action=" in content:
+        parts = content.split("do(action=", 1)
+        thinking = parts[0].strip()
+        action = "do(action=" + parts[1]
+        return thinking, _strip_answer_end(action)
+
+    # Rule 3: Fallback to legacy XML tag parsing
+    if "<answer>" in content:
+        parts = content.split("<answer>", 1)
+        thinking = parts[0].replace("<think>", "").replace("</think>", "").strip()
+        action = parts[1].replace("</answer>", "").strip()
+        return thinking, action
+
+    # Rule 4: No markers found, return content as action
+    return "", content
+
+
+def _strip_answer_end(action: str) -> str:
+    """Remove the closing </answer> tag that follows a complete answer."""
+    action = action.rstrip()
+    if action.endswith("</answer>"):
+        action = action[: -len("</answer>")].rstrip()
+    return action
+
+
+def _parse_usage(usage: Any) -> ModelUsage | None:
+    """Convert an OpenAI usage object into ModelUsage."""
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    return ModelUsage(
+        prompt_tokens=usage.prompt_tokens or 0,
+        completion_tokens=usage.completion_tokens or 0,
+        cached_tokens=getattr(details, "cached_tokens", None) or 0,
+    )
+
+
+_ACTION_MARKERS = ("finish(message=", "do(action=")
+_THINKING_END_MARKERS = _ACTION_MARKERS + ("<answer>",)
+_THINKING_TAGS = ("<think>", "</think>")
+# Tags a held-back tail of thinking text may still turn into
+_HELD_TAGS = _THINKING_TAGS + ("<answer>",)
+
+
+def _find_action_end(content: str, batch: bool = False) -> int | None:
+    """
+    Find the end of the first complete do(...)/finish(...) call.
+
+    Follows the same marker precedence as _parse_response and
+    tracks brackets and quoted strings (with escapes) after the marker.
+    With batch set, do(...) calls directly following the first one are
+    included, so the end is only known once something else follows.
+
+    Returns:
+        Index just past the closing parenthesis, or None if the call is not
+        complete yet.
+    """
+    for marker in _ACTION_MARKERS:
+        start = content.find(marker)
+        if start != -1:
+            break
+    else:
+        return None
+
+    end = _call_end(content, start + marker.index("("))
+    if not batch or marker != "do(action=":
+        return end
+
+    while end is not None:
+        following = content[end:].lstrip(" \t\r\n;")
+        if "do(".startswith(following):
+            return None
+        if not following.startswith("do("):
+            return end
+        end = _call_end(content, len(content) - len(following) + len("do"))
+    return None
+
+
+def _call_end(content: str, open_paren: int) -> int | None:
+    """Index just past the bracket matching the one at open_paren, if any."""
+    depth = 0
+    quote = None
+    escaped = False
+    for i in range(open_paren, len(content)):
+        char = content[i]
+        if quote:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return None
+
+
+def _streamable_thinking(content: str) -> str:
+    """
+    Get the part of partial content that is certainly thinking text.
+
+    Stops before any action marker, holds back a tail that could still
+    become a marker or tag, and removes <think> tags.
+    """
+    end = len(content)
+    for marker in _THINKING_END_MARKERS:
+        index = content.find(marker)
+        if index != -1:
+            end = min(end, index)
+    if end == len(content):
+        end = max(0, end - max(len(marker) for marker in _THINKING_END_MARKERS))
+
+    thinking = content[:end]
+    # Only a "<" that can still complete a tag is held back, so a bare "<"
+    # in the thinking text does not stall the stream
+    for length in range(min(len(thinking), max(map(len, _HELD_TAGS)) - 1), 0, -1):
+        suffix = thinking[-length:]
+        if any(tag.startswith(suffix) for tag in _HELD_TAGS):
+            thinking = thinking[:-length]
+            break
+
+    for tag in _THINKING_TAGS:
+        thinking = thinking.replace(tag, "")
+    return thinking.lstrip()
 
 
 class MessageBuilder:
@@ -126,7 +525,7 @@ class MessageBuilder:
 
     @staticmethod
     def create_user_message(
-        text: str, image_base64: str | None = None
+        text: str, image_base64: str | None = None, mime_type: str = "image/png"
     ) -> dict[str, Any]:
         """
         Create a user message with optional image.
@@ -134,6 +533,7 @@ class MessageBuilder:
         Args:
             text: Text content.
             image_base64: Optional base64-encoded image.
+            mime_type: MIME type of the encoded image.
 
         Returns:
             Message dictionary.
@@ -144,7 +544,7 @@ class MessageBuilder:
             content.append(
                 {
                     "type": "image_url",
-                    "image_url": {"url": f"data:image/png;base64,{image_base64}"},
+                    "image_url": {"url": f"data:{mime_type};base64,{image_base64}"},
                 }
             )
 
@@ -187,4 +587,5 @@ class MessageBuilder:
             JSON string with screen info.
         """
         info = {"current_app": current_app, **extra_info}
-        return json.dumps(info, ensure_ascii=False)
+        # Sorted keys keep the text byte-identical for identical info
+        return json.dumps(info, ensure_ascii=False, sort_keys=True)
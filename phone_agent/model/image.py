@@ -0,0 +1,85 @@
+"""Image preprocessing for screenshots sent to the model."""
+
+import base64
+from dataclasses import dataclass
+from io import BytesIO
+
+from PIL import Image
+
+from phone_agent.adb.screenshot import Screenshot
+
+_MIME_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+@dataclass
+class ImageConfig:
+    """
+    Configuration for the screenshot sent to the model.
+
+    Downscaling keeps the aspect ratio and never crops or pads, so the 0-1000
+    relative coordinates the model answers with still map onto the full
+    device resolution in ActionHandler.
+
+    Attributes:
+        max_side: Longest side in pixels after downscaling, None to keep size.
+        format: Encoding format, one of "PNG", "JPEG" or "WEBP".
+        quality: Encoder quality for JPEG/WebP (1-100).
+        grayscale: Convert to 8-bit grayscale before encoding.
+    """
+
+    max_side: int | None = None
+    format: str = "PNG"
+    quality: int = 85
+    grayscale: bool = False
+
+    def __post_init__(self):
+        self.format = self.format.upper()
+        if self.format == "JPG":
+            self.format = "JPEG"
+        if self.format not in _MIME_TYPES:
+            raise ValueError(f"Unsupported image format: {self.format}")
+
+    @property
+    def mime_type(self) -> str:
+        """MIME type of the encoded image."""
+        return _MIME_TYPES[self.format]
+
+    @property
+    def is_passthrough(self) -> bool:
+        """Whether the screenshot can be sent as captured."""
+        return self.max_side is None and self.format == "PNG" and not self.grayscale
+
+
+def preprocess_image(
+    screenshot: Screenshot, config: ImageConfig | None = None
+) -> tuple[str, str]:
+    """
+    Prepare a screenshot for the model.
+
+    Args:
+        screenshot: The captured screenshot.
+        config: Preprocessing configuration. None sends the image unchanged.
+
+    Returns:
+        Tuple of (base64 data, MIME type).
+    """
+    config = config or ImageConfig()
+    if config.is_passthrough:
+        return screenshot.base64_data, config.mime_type
+
+    img = screenshot.to_image()
+    if config.grayscale:
+        img = img.convert("L")
+
+    if config.max_side and max(img.size) > config.max_side:
+        scale = config.max_side / max(img.size)
+        size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        img = img.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+
+    buffered = BytesIO()
+    if config.format == "PNG":
+        img.save(buffered, format="PNG")
+    else:
+        img.save(buffered, format=config.format, quality=config.quality)
+
+    return base64.b64encode(buffered.getvalue()).decode("utf-8"), config.mime_type
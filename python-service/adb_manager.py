@@ -285,7 +285,10 @@ class ADBManager:
             try:
                 size_output = device.shell("wm size").strip()
                 if "Physical size:" in size_output:
-                    size_str = size_output.split("Physical size:")[1].strip()
+                    # 可能还有一行 "Override size:"，只取物理分辨率那一行
+                    size_str = (
+                        size_output.split("Physical size:")[1].strip().splitlines()[0]
+                    )
                     width, height = map(int, size_str.split("x"))
                 else:
                     width, height = 1080, 1920  # 默认值
@@ -5,11 +5,11 @@ AI 核心模块
 
 import asyncio
 import logging
-from typing import AsyncGenerator, Optional
+from typing import AsyncGenerator, Callable, Optional, Union
 
 from phone_agent import PhoneAgent
 from phone_agent.agent import AgentConfig, StepResult
-from phone_agent.model import ModelConfig
+from phone_agent.model import ModelConfig, close_shared_http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +35,8 @@ class AICore:
         self.adb_manager = adb_manager
         self.agent: Optional[PhoneAgent] = None
         self._initialized = False
+        # 当前步骤的思考流接收函数
+        self._thinking_sink: Optional[Callable[[str], None]] = None
 
     async def initialize(
         self,
@@ -62,11 +64,24 @@ class AICore:
             if not target_device_id:
                 raise ValueError("未连接设备，请先连接设备")
 
+            # 获取屏幕分辨率，用于截图失败时生成同尺寸的占位图
+            screen_size = None
+            device_info = await self.adb_manager.get_device_info(target_device_id)
+            if device_info:
+                screen_size = (
+                    device_info["screen_width"],
+                    device_info["screen_height"],
+                )
+
             # 创建模型配置
             model_config = ModelConfig(
                 base_url=base_url,
                 api_key=api_key,
                 model_name=model_name,
+                # 流式接收，动作完整后立即执行，并实时推送思考过程。
+                # 提前结束读取时收不到末尾分片中的 usage，步骤结果的 usage 为 None，
+                # 上下文预算只能依靠估算（见 ModelConfig.stream）
+                stream=True,
             )
 
             # 创建 Agent 配置
@@ -74,15 +89,20 @@ class AICore:
                 device_id=target_device_id,
                 lang=lang,
                 max_steps=max_steps,
+                screen_size=screen_size,
                 verbose=False,  # 不在控制台输出，通过流式 API 返回
             )
 
+            # 重新初始化时先释放旧 Agent 的工作线程
+            await self._close_agent()
+
             # 创建 PhoneAgent 实例
             self.agent = PhoneAgent(
                 model_config=model_config,
                 agent_config=agent_config,
                 confirmation_callback=self._confirmation_callback,
                 takeover_callback=self._takeover_callback,
+                thinking_callback=self._thinking_callback,
             )
 
             self._initialized = True
@@ -114,9 +134,8 @@ class AICore:
         logger.info("重置 Agent 状态，清空历史对话...")
         self.agent.reset()
 
-        # 在后台线程中执行（避免阻塞）
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(None, self.agent.run, task)
+        # 异步执行：模型请求走共享连接池，不占用执行器线程
+        result = await self.agent.arun(task)
         return result
 
     async def run_task_stream(self, task: str) -> AsyncGenerator[dict, None]:
@@ -145,8 +164,12 @@ class AICore:
 
             # 执行第一步
             logger.info("执行第一步，准备调用模型...")
-            loop = asyncio.get_event_loop()
-            step_result = await loop.run_in_executor(None, self.agent.step, task)
+            step_result = None
+            async for event in self._run_step(task):
+                if isinstance(event, StepResult):
+                    step_result = event
+                else:
+                    yield event
             logger.info(
                 f"第一步执行完成: thinking={step_result.thinking[:50]}..., action={step_result.action}"
             )
@@ -174,7 +197,11 @@ class AICore:
             while self.agent.step_count < self.agent.agent_config.max_steps:
                 # 执行下一步
                 logger.info(f"执行第 {self.agent.step_count + 1} 步...")
-                step_result = await loop.run_in_executor(None, self.agent.step)
+                async for event in self._run_step():
+                    if isinstance(event, StepResult):
+                        step_result = event
+                    else:
+                        yield event
                 logger.info(
                     f"第 {self.agent.step_count} 步执行完成: thinking={step_result.thinking[:50] if step_result.thinking else ''}..."
                 )
@@ -215,6 +242,67 @@ class AICore:
             logger.error(f"执行任务失败: {e}", exc_info=True)
             yield {"type": "error", "message": str(e)}
 
+        finally:
+            # 达到最大步数、出错或任务被取消时，同样恢复用户原来的输入法
+            await self._restore_ime()
+
+    async def _run_step(
+        self, task: Optional[str] = None
+    ) -> AsyncGenerator[Union[dict, StepResult], None]:
+        """
+        异步执行一步，同时转发模型的思考流
+
+        Args:
+            task: 任务描述（仅第一步需要）
+
+        Yields:
+            思考事件字典（type="thinking"），最后产出该步的 StepResult
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[str] = asyncio.Queue()
+        self._thinking_sink = lambda delta: loop.call_soon_threadsafe(
+            queue.put_nowait, delta
+        )
+        step_number = self.agent.step_count + 1
+
+        try:
+            step_future = asyncio.ensure_future(self.agent.astep(task))
+            while True:
+                get_delta = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait(
+                    {get_delta, step_future}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if get_delta not in done:
+                    get_delta.cancel()
+                    break
+                yield {
+                    "type": "thinking",
+                    "step_count": step_number,
+                    "delta": get_delta.result(),
+                }
+        finally:
+            self._thinking_sink = None
+
+        # 步骤结束前已入队但尚未发送的思考片段
+        await asyncio.sleep(0)
+        while not queue.empty():
+            yield {
+                "type": "thinking",
+                "step_count": step_number,
+                "delta": queue.get_nowait(),
+            }
+
+        yield step_future.result()
+
+    async def _restore_ime(self):
+        """恢复任务开始前的输入法，失败时只记录日志"""
+        if not self.agent:
+            return
+        try:
+            await asyncio.to_thread(self.agent.restore_ime)
+        except Exception as e:
+            logger.warning(f"恢复输入法失败: {e}")
+
     def reset(self):
         """重置 AI 状态"""
         if self.agent:
@@ -257,6 +345,17 @@ class AICore:
         logger.warning(f"敏感操作需要确认: {message}")
         return True
 
+    def _thinking_callback(self, delta: str):
+        """
+        模型思考流回调
+
+        Args:
+            delta: 新增的思考文本
+        """
+        sink = self._thinking_sink
+        if sink:
+            sink(delta)
+
     def _takeover_callback(self, message: str):
         """
         用户接管回调
@@ -267,8 +366,21 @@ class AICore:
         logger.warning(f"需要用户接管: {message}")
         # 实际应用中可以通过 WebSocket 通知前端
 
+    async def _close_agent(self):
+        """关闭当前 Agent：取消后台截图、停止工作线程并恢复输入法"""
+        if not self.agent:
+            return
+        agent, self.agent = self.agent, None
+        self._initialized = False
+        try:
+            await asyncio.to_thread(agent.close)
+        except Exception as e:
+            logger.warning(f"关闭 Agent 失败: {e}")
+
     async def cleanup(self):
         """清理资源"""
-        self.agent = None
+        await self._close_agent()
+        # 在事件循环关闭前关闭模型请求的共享连接池
+        await close_shared_http_clients()
         self._initialized = False
         logger.info("AI 核心模块已清理")
@@ -183,6 +183,17 @@ async def video_stream(websocket: WebSocket):
         await websocket.close(code=1011, reason=str(e))
 
 
+@app.get("/api/video/stats")
+async def get_video_stats():
+    """获取视频流客户端的积压和丢帧统计"""
+    if not video_stream_manager:
+        return JSONResponse(
+            {"error": "Video stream manager not initialized"}, status_code=500
+        )
+
+    return {"clients": video_stream_manager.get_client_stats()}
+
+
 # ==================== AI 任务执行 API ====================
 
 
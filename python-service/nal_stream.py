@@ -0,0 +1,199 @@
+"""
+Annex-B 码流解析模块
+将 Scrcpy 媒体通道的数据切分为媒体包（帧）和 NAL 单元
+"""
+
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+# 三字节起始码；四字节起始码 00 00 00 01 即前面多一个 0x00
+START_CODE = b"\x00\x00\x01"
+
+# Scrcpy 帧头（send_frame_meta=true）：8 字节 PTS 及标志位 + 4 字节包长度，big-endian
+PACKET_HEADER_SIZE = 12
+PACKET_FLAG_CONFIG = 1 << 63
+PACKET_FLAG_KEY_FRAME = 1 << 62
+PACKET_PTS_MASK = PACKET_FLAG_KEY_FRAME - 1
+
+
+@dataclass
+class ScrcpyPacket:
+    """Scrcpy 媒体包"""
+
+    pts: int
+    config: bool  # 编解码器配置包（H.264 为 SPS + PPS），不含画面
+    key_frame: bool
+    data: bytes  # Annex-B 数据，一帧的全部 NAL 单元
+    # 是否被后续帧参考；非参考帧可以单独丢弃而不影响解码
+    reference: bool = True
+
+
+class ScrcpyPacketReader:
+    """
+    Scrcpy 媒体包读取器
+
+    按帧头中的长度切分字节流，每个媒体包即一个完整的访问单元（一帧），
+    无需扫描起始码即可得到帧边界。
+    """
+
+    def __init__(self):
+        """初始化读取器"""
+        self._buffer = bytearray()
+        # 下一个未读帧头的位置
+        self._read_pos = 0
+
+    def feed(self, data: bytes) -> Iterator[ScrcpyPacket]:
+        """
+        追加数据并输出其中已完整的媒体包
+
+        Args:
+            data: 新收到的字节流数据
+
+        Yields:
+            ScrcpyPacket: 一个完整的媒体包
+        """
+        buffer = self._buffer
+        # 已消费部分不少于剩余部分时才整理，保证均摊线性时间
+        if self._read_pos and self._read_pos >= len(buffer) - self._read_pos:
+            del buffer[: self._read_pos]
+            self._read_pos = 0
+        buffer += data
+
+        while len(buffer) - self._read_pos >= PACKET_HEADER_SIZE:
+            header_end = self._read_pos + PACKET_HEADER_SIZE
+            pts_flags = int.from_bytes(buffer[self._read_pos : header_end - 4], "big")
+            size = int.from_bytes(buffer[header_end - 4 : header_end], "big")
+            if len(buffer) < header_end + size:
+                # 包体尚未收全
+                return
+
+            self._read_pos = header_end + size
+            yield ScrcpyPacket(
+                pts=pts_flags & PACKET_PTS_MASK,
+                config=bool(pts_flags & PACKET_FLAG_CONFIG),
+                key_frame=bool(pts_flags & PACKET_FLAG_KEY_FRAME),
+                data=bytes(buffer[header_end : self._read_pos]),
+            )
+
+
+def iter_nal_headers(data: bytes) -> Iterator[int]:
+    """
+    依次输出一段完整 Annex-B 数据中每个 NAL 单元头的第一个字节
+
+    直接在原数据上查找起始码，不做拷贝，可随时提前结束。
+
+    Args:
+        data: Annex-B 数据，如一个媒体包
+
+    Yields:
+        int: NAL 单元头的第一个字节
+    """
+    pos = data.find(START_CODE)
+    while pos != -1 and pos + len(START_CODE) < len(data):
+        header_pos = pos + len(START_CODE)
+        yield data[header_pos]
+        pos = data.find(START_CODE, header_pos)
+
+
+class AnnexBSplitter:
+    """
+    增量式 Annex-B 起始码扫描器
+
+    视频流已改用 ScrcpyPacketReader 按帧头切分，此类保留用于没有帧头的
+    原始 Annex-B 数据源（如 send_frame_meta=false 或 screenrecord 导出的
+    码流），以及 benchmarks/bench_nal_splitter.py 的性能对比。
+
+    功能：
+    - 接收任意切分的字节流数据块，输出完整的 NAL 单元（含起始码）
+    - 每个字节只扫描一次，已切出的数据通过读偏移跳过，不做整块拷贝
+    - 仅在已消费部分不少于剩余部分时整理缓冲区，整体为均摊线性时间
+
+    输出的 memoryview 直接引用内部缓冲区，调用方应在下一次 feed() 前
+    拷贝所需数据并 release()，否则缓冲区无法原地扩展，只能重新分配。
+    """
+
+    def __init__(self):
+        """初始化扫描器"""
+        self._buffer = bytearray()
+        # 当前 NAL 单元起始码的位置，-1 表示尚未遇到起始码
+        self._nal_start = -1
+        # 当前 NAL 单元负载的起始位置，之前的 0x00 不能算作下一个起始码
+        self._payload_start = 0
+        # 下一次查找起始码的位置
+        self._scan_pos = 0
+
+    def feed(self, data: bytes) -> Iterator[memoryview]:
+        """
+        追加数据并输出其中已完整的 NAL 单元
+
+        NAL 单元在遇到下一个起始码时才算完整，因此最后一个单元会保留到
+        下一次 feed() 或 flush()。
+
+        Args:
+            data: 新收到的字节流数据
+
+        Yields:
+            memoryview: 一个完整的 NAL 单元，包含 3 或 4 字节起始码
+        """
+        self._compact()
+        try:
+            self._buffer += data
+        except BufferError:
+            # 调用方仍持有上次输出的切片，只能重新分配
+            self._buffer = self._buffer + data
+
+        buffer = self._buffer
+        view = memoryview(buffer)
+        try:
+            while True:
+                pos = buffer.find(START_CODE, self._scan_pos)
+                if pos == -1:
+                    # 末尾两个字节可能是被截断的起始码，下次从这里继续查找
+                    self._scan_pos = max(self._scan_pos, len(buffer) - 2)
+                    return
+
+                start = pos
+                if pos > self._payload_start and buffer[pos - 1] == 0:
+                    start = pos - 1
+                if self._nal_start >= 0:
+                    yield view[self._nal_start : start]
+
+                self._nal_start = start
+                self._payload_start = self._scan_pos = pos + len(START_CODE)
+        finally:
+            view.release()
+
+    def flush(self) -> Optional[memoryview]:
+        """
+        输出缓冲区中最后一个未结束的 NAL 单元并清空状态
+
+        用于码流结束或已知数据块边界即单元边界的场景。
+
+        Returns:
+            Optional[memoryview]: 最后一个 NAL 单元，没有时返回 None
+        """
+        buffer, nal_start = self._buffer, self._nal_start
+        self.__init__()
+        if nal_start < 0 or nal_start >= len(buffer):
+            return None
+        return memoryview(buffer)[nal_start:]
+
+    def _compact(self):
+        """丢弃已输出的数据，复制量不超过已消费的数据量"""
+        if self._nal_start >= 0:
+            consumed = self._nal_start
+        else:
+            # 尚未遇到起始码：保留扫描位置前一字节，它可能属于四字节起始码
+            consumed = max(self._scan_pos - 1, 0)
+        if consumed == 0 or consumed < len(self._buffer) - consumed:
+            return
+
+        try:
+            del self._buffer[:consumed]
+        except BufferError:
+            self._buffer = self._buffer[consumed:]
+
+        if self._nal_start >= 0:
+            self._nal_start -= consumed
+        self._payload_start = max(self._payload_start - consumed, 0)
+        self._scan_pos -= consumed
@@ -0,0 +1,140 @@
+"""
+视频编解码器模块
+按 Scrcpy 握手中的 codec_id 解析 H.264 / H.265 NAL 单元类型
+"""
+
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+from nal_stream import ScrcpyPacket, iter_nal_headers
+
+# Scrcpy codec_id：编解码器名称的 ASCII 码，4 字节 big-endian
+CODEC_ID_H264 = 0x68323634  # "h264"
+CODEC_ID_H265 = 0x68323635  # "h265"
+CODEC_ID_AV1 = 0x00617631  # "\0av1"
+
+
+class VideoCodec(ABC):
+    """
+    视频编解码器基类
+
+    子类描述 NAL 单元头的格式，用于识别参数集、关键帧和非参考帧。
+    """
+
+    name = ""
+    codec_id = 0
+    # 参数集 NAL 类型
+    parameter_set_types = frozenset()
+
+    @abstractmethod
+    def nal_type(self, header: int) -> int:
+        """
+        从 NAL 单元头第一个字节取出 NAL 类型
+
+        Args:
+            header: NAL 单元头第一个字节
+        """
+
+    @abstractmethod
+    def is_vcl(self, nal_type: int) -> bool:
+        """是否为图像数据（slice）NAL 单元"""
+
+    @abstractmethod
+    def is_key_frame(self, nal_type: int) -> bool:
+        """是否为可独立解码的关键帧（随机接入点）"""
+
+    @abstractmethod
+    def is_reference(self, header: int) -> bool:
+        """该帧是否会被后续帧参考"""
+
+    def inspect(self, packet: ScrcpyPacket):
+        """
+        根据帧内第一个 slice 的 NAL 头更新媒体包的关键帧和参考帧标记
+
+        配置包等不含 slice 的媒体包保持不变。
+
+        Args:
+            packet: 媒体包
+        """
+        for header in iter_nal_headers(packet.data):
+            nal_type = self.nal_type(header)
+            if self.is_vcl(nal_type):
+                packet.key_frame = self.is_key_frame(nal_type)
+                packet.reference = self.is_reference(header)
+                return
+
+
+class H264Codec(VideoCodec):
+    """H.264 / AVC：1 字节 NAL 头，forbidden_zero_bit(1) + nal_ref_idc(2) + type(5)"""
+
+    name = "h264"
+    codec_id = CODEC_ID_H264
+    # SPS (7), PPS (8)
+    parameter_set_types = frozenset({7, 8})
+
+    def nal_type(self, header: int) -> int:
+        return header & 0x1F
+
+    def is_vcl(self, nal_type: int) -> bool:
+        # 1: 非 IDR slice，2-4: 数据分区，5: IDR slice
+        return 1 <= nal_type <= 5
+
+    def is_key_frame(self, nal_type: int) -> bool:
+        return nal_type == 5
+
+    def is_reference(self, header: int) -> bool:
+        # nal_ref_idc 为 0 表示不被参考
+        return (header >> 5) & 0x03 != 0
+
+
+class H265Codec(VideoCodec):
+    """H.265 / HEVC：2 字节 NAL 头，第一个字节为 forbidden_zero_bit(1) + type(6) + ..."""
+
+    name = "h265"
+    codec_id = CODEC_ID_H265
+    # VPS (32), SPS (33), PPS (34)
+    parameter_set_types = frozenset({32, 33, 34})
+
+    def nal_type(self, header: int) -> int:
+        return (header >> 1) & 0x3F
+
+    def is_vcl(self, nal_type: int) -> bool:
+        return nal_type <= 31
+
+    def is_key_frame(self, nal_type: int) -> bool:
+        # IRAP：BLA (16-18)、IDR (19-20)、CRA (21)、保留 IRAP (22-23)
+        return 16 <= nal_type <= 23
+
+    def is_reference(self, header: int) -> bool:
+        # 子层非参考图像：TRAIL_N、TSA_N、STSA_N、RADL_N、RASL_N 及保留类型，
+        # 即 0-14 之间的偶数类型
+        nal_type = self.nal_type(header)
+        return nal_type > 14 or nal_type % 2 == 1
+
+
+CODECS: Dict[int, VideoCodec] = {
+    codec.codec_id: codec for codec in (H264Codec(), H265Codec())
+}
+
+
+def get_codec(codec_id: int) -> Optional[VideoCodec]:
+    """
+    按 Scrcpy codec_id 获取编解码器
+
+    Args:
+        codec_id: 握手中读取的 codec_id
+
+    Returns:
+        Optional[VideoCodec]: 编解码器，不支持 NAL 解析（如 AV1）时返回 None
+    """
+    return CODECS.get(codec_id)
+
+
+def codec_name(codec_id: int) -> str:
+    """
+    将 codec_id 转为可读名称，如 "h264"
+
+    Args:
+        codec_id: 握手中读取的 codec_id
+    """
+    return codec_id.to_bytes(4, "big").strip(b"\x00").decode("ascii", errors="replace")
@@ -9,17 +9,169 @@ import os
 import socket
 import subprocess
 import sys
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, Set
+from typing import Dict, List, Optional
 
 from fastapi import WebSocket
 
+from nal_stream import ScrcpyPacket, ScrcpyPacketReader
+from video_codec import CODEC_ID_H264, VideoCodec, codec_name, get_codec
+
 logger = logging.getLogger(__name__)
 
 # Scrcpy 3.x 反向通道配置（与 demo/adb_scrcpy.py 保持一致）
 SCRCPY_SOCKET_NAME = "scrcpy"
 SCRCPY_LOCAL_PORT = 27183
 
+# 每个客户端最多积压的帧数（30fps 下约 1 秒）
+CLIENT_QUEUE_SIZE = 30
+
+# 关键帧缓存上限（scrcpy 默认每 10 秒一个关键帧，2Mbps 下一个 GOP 约 2.5MB）
+KEY_FRAME_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+
+class KeyFrameCache:
+    """
+    关键帧缓存
+
+    保存最近的配置包、最近的关键帧及其后同一 GOP 内的帧，每个关键帧到达时
+    整体替换。新客户端先回放缓存，即可立即解码出当前画面。
+    """
+
+    def __init__(self, max_bytes: int = KEY_FRAME_CACHE_MAX_BYTES):
+        """
+        初始化关键帧缓存
+
+        Args:
+            max_bytes: GOP 帧的总字节数上限
+        """
+        self.max_bytes = max_bytes
+        self.clear()
+
+    def clear(self):
+        """清空缓存"""
+        self._config: Optional[ScrcpyPacket] = None
+        self._gop: List[ScrcpyPacket] = []
+        self._gop_bytes = 0
+        # GOP 超出上限后只保留关键帧，回放后需等待下一个关键帧
+        self._truncated = False
+
+    def add(self, packet: ScrcpyPacket):
+        """
+        记录一帧
+
+        Args:
+            packet: 媒体包
+        """
+        if packet.config:
+            # 新的配置（如分辨率变化）使之前的帧失效
+            self._config = packet
+            self._gop = []
+            self._gop_bytes = 0
+            self._truncated = False
+        elif packet.key_frame:
+            self._gop = [packet]
+            self._gop_bytes = len(packet.data)
+            self._truncated = False
+        elif self._gop and not self._truncated:
+            if self._gop_bytes + len(packet.data) > self.max_bytes:
+                del self._gop[1:]
+                self._gop_bytes = len(self._gop[0].data)
+                self._truncated = True
+            else:
+                self._gop.append(packet)
+                self._gop_bytes += len(packet.data)
+
+    def replay_to(self, client: "VideoClient"):
+        """
+        把缓存的帧交给新客户端，先于实时帧发送
+
+        Args:
+            client: 视频流客户端
+        """
+        client.replay = ([self._config] if self._config else []) + self._gop
+        client.waiting_for_key_frame = self._truncated or not self._gop
+
+
+@dataclass
+class VideoClient:
+    """
+    视频流客户端
+
+    每个客户端有独立的有界发送队列，由专门的发送任务消费，
+    慢客户端不会阻塞视频流读取和其他客户端。
+    """
+
+    websocket: WebSocket
+    # 加入时回放的缓存帧，发送任务先发送这些帧
+    replay: List[ScrcpyPacket] = field(default_factory=list)
+    queue: asyncio.Queue = field(
+        default_factory=lambda: asyncio.Queue(CLIENT_QUEUE_SIZE)
+    )
+    sender_task: Optional[asyncio.Task] = None
+    sent_frames: int = 0
+    dropped_frames: int = 0
+    max_lag: int = 0
+    # 队列溢出后丢弃后续帧，直到下一个关键帧
+    waiting_for_key_frame: bool = False
+
+    @property
+    def lag(self) -> int:
+        """当前积压的帧数"""
+        return self.queue.qsize()
+
+    def enqueue(self, packet: ScrcpyPacket):
+        """
+        将一帧放入发送队列
+
+        队列已满时，非参考帧直接丢弃；参考帧被丢弃后，后续帧都无法解码，
+        因此一直丢弃到下一个关键帧。关键帧和配置包到达时清空积压，保证一定能入队。
+
+        Args:
+            packet: 媒体包
+        """
+        if packet.key_frame:
+            self.waiting_for_key_frame = False
+        elif self.waiting_for_key_frame and not packet.config:
+            self.dropped_frames += 1
+            return
+
+        if self.queue.full():
+            if not (packet.key_frame or packet.config):
+                # 丢弃参考帧会破坏后续帧的解码
+                self.waiting_for_key_frame = packet.reference
+                self.dropped_frames += 1
+                return
+            self._discard_backlog()
+            # 配置包之后必须从关键帧开始解码
+            self.waiting_for_key_frame = packet.config
+
+        self.queue.put_nowait(packet)
+        self.max_lag = max(self.max_lag, self.queue.qsize())
+
+    def get_stats(self) -> dict:
+        """获取发送统计"""
+        return {
+            "lag": self.lag,
+            "max_lag": self.max_lag,
+            "sent_frames": self.sent_frames,
+            "dropped_frames": self.dropped_frames,
+            "waiting_for_key_frame": self.waiting_for_key_frame,
+        }
+
+    def _discard_backlog(self):
+        """丢弃积压的帧，保留解码器需要的配置包"""
+        config_packets = []
+        while not self.queue.empty():
+            packet = self.queue.get_nowait()
+            if packet.config:
+                config_packets.append(packet)
+            else:
+                self.dropped_frames += 1
+        for packet in config_packets:
+            self.queue.put_nowait(packet)
+
 
 class VideoStreamManager:
     """
@@ -42,9 +194,12 @@ class VideoStreamManager:
         self.adb_manager = adb_manager
         self.scrcpy_process: Optional[subprocess.Popen] = None
         self.socket: Optional[socket.socket] = None
-        self.clients: Set[WebSocket] = set()
+        self.clients: Dict[WebSocket, VideoClient] = {}
         self._streaming_task: Optional[asyncio.Task] = None
         self._stop_streaming = False
+        self._key_frame_cache = KeyFrameCache()
+        # 由握手中的 codec_id 决定，用于识别关键帧和非参考帧
+        self._codec: Optional[VideoCodec] = None
 
         # 新增：本地监听 socket（反向通道用）
         self._server_socket: Optional[socket.socket] = None
@@ -204,6 +359,8 @@ class VideoStreamManager:
                 "audio=false "
                 "control=false "
                 "stay_awake=true "
+                # 帧头用于按帧切分视频流
+                "send_frame_meta=true "
             )
 
             logger.info(f"执行命令: adb -s {target_id} shell {shell_cmd}")
@@ -302,8 +459,12 @@ class VideoStreamManager:
                     "\x00"
                 )
 
-                # 2. Codec ID（4 字节）
-                codec_id = await asyncio.to_thread(self._recv_exact, self.socket, 4)
+                # 2. Codec ID（4 字节，编解码器名称的 ASCII 码）
+                codec_id_bytes = await asyncio.to_thread(
+                    self._recv_exact, self.socket, 4
+                )
+                codec_id = int.from_bytes(codec_id_bytes, "big")
+                self._codec = get_codec(codec_id)
 
                 # 3. 宽高（4 + 4 字节，big-endian）
                 width_bytes = await asyncio.to_thread(self._recv_exact, self.socket, 4)
@@ -313,8 +474,12 @@ class VideoStreamManager:
 
                 logger.info(
                     f"scrcpy 设备信息: 名称={device_name}, "
-                    f"codec_id={codec_id}, 分辨率={width}x{height}"
+                    f"codec={codec_name(codec_id)}, 分辨率={width}x{height}"
                 )
+                if self._codec is None:
+                    logger.warning("不支持解析该编码的 NAL 单元，关键帧仅依据 Scrcpy 帧头标记")
+                if codec_id != CODEC_ID_H264:
+                    logger.warning("前端目前仅支持解码 H.264 视频流")
 
                 # 设置为非阻塞模式，开始接收视频流
                 self.socket.setblocking(False)
@@ -349,6 +514,7 @@ class VideoStreamManager:
                 await self._streaming_task
             except asyncio.CancelledError:
                 pass
+        self._key_frame_cache.clear()
 
         if self.socket:
             try:
@@ -403,7 +569,11 @@ class VideoStreamManager:
         Args:
             websocket: WebSocket 连接
         """
-        self.clients.add(websocket)
+        client = VideoClient(websocket)
+        # 回放与注册之间没有 await，缓存帧与实时帧之间不会遗漏或重复
+        self._key_frame_cache.replay_to(client)
+        client.sender_task = asyncio.create_task(self._send_loop(client))
+        self.clients[websocket] = client
         logger.info(f"添加视频流客户端，当前客户端数: {len(self.clients)}")
 
         # 如果还没有启动流，则启动
@@ -426,8 +596,16 @@ class VideoStreamManager:
         except Exception as e:
             logger.debug(f"客户端连接异常: {e}")
         finally:
-            self.clients.discard(websocket)
-            logger.info(f"移除视频流客户端，当前客户端数: {len(self.clients)}")
+            client.sender_task.cancel()
+            try:
+                await client.sender_task
+            except asyncio.CancelledError:
+                pass
+            self.clients.pop(websocket, None)
+            logger.info(
+                f"移除视频流客户端，统计: {client.get_stats()}，"
+                f"当前客户端数: {len(self.clients)}"
+            )
 
             # 如果没有客户端了，停止流
             if len(self.clients) == 0:
@@ -437,10 +615,7 @@ class VideoStreamManager:
         """视频流转发循环"""
         buffer_size = 65536  # 64KB 缓冲区
         # buffer_size = 16384  # 调整为16K
-        buffer = bytearray()
-
-        # 缓存 SPS/PPS/IDR 帧，用于新客户端连接
-        sps_pps_idr_cache = None
+        reader = ScrcpyPacketReader()
 
         try:
             while not self._stop_streaming:
@@ -451,82 +626,18 @@ class VideoStreamManager:
                         logger.warning("视频流 socket 关闭")
                         break
 
-                    buffer.extend(data)
-
-                    # 查找 H.264 NAL 单元边界（0x00 0x00 0x00 0x01 或 0x00 0x00 0x01）
-                    while True:
-                        # 查找起始码
-                        start_code_4 = buffer.find(b"\x00\x00\x00\x01")
-                        start_code_3 = buffer.find(b"\x00\x00\x01")
-
-                        if start_code_4 == -1 and start_code_3 == -1:
-                            # 没有找到起始码，继续接收数据
-                            break
-
-                        # 选择更早的起始码
-                        if start_code_4 == -1:
-                            start_pos = start_code_3
-                            start_code_len = 3
-                        elif start_code_3 == -1:
-                            start_pos = start_code_4
-                            start_code_len = 4
-                        else:
-                            if start_code_3 < start_code_4:
-                                start_pos = start_code_3
-                                start_code_len = 3
-                            else:
-                                start_pos = start_code_4
-                                start_code_len = 4
-
-                        # 查找下一个起始码
-                        next_start_code_4 = buffer.find(
-                            b"\x00\x00\x00\x01", start_pos + start_code_len
-                        )
-                        next_start_code_3 = buffer.find(
-                            b"\x00\x00\x01", start_pos + start_code_len
-                        )
-
-                        if next_start_code_4 == -1 and next_start_code_3 == -1:
-                            # 没有找到下一个起始码，继续接收数据
-                            break
-
-                        # 选择更早的下一个起始码
-                        if next_start_code_4 == -1:
-                            end_pos = next_start_code_3
-                        elif next_start_code_3 == -1:
-                            end_pos = next_start_code_4
-                        else:
-                            end_pos = min(next_start_code_3, next_start_code_4)
-
-                        # 提取 NAL 单元
-                        nal_unit = bytes(buffer[start_pos:end_pos])
-
-                        # 检查 NAL 单元类型
-                        if len(nal_unit) > start_code_len:
-                            nal_type = (nal_unit[start_code_len] >> 1) & 0x3F
-
-                            # SPS (7), PPS (8), IDR (5)
-                            if nal_type in [5, 7, 8]:
-                                # 缓存关键帧
-                                if sps_pps_idr_cache is None:
-                                    sps_pps_idr_cache = bytearray()
-                                sps_pps_idr_cache.extend(nal_unit)
-
-                        # 发送给所有客户端
-                        if self.clients:
-                            disconnected = set()
-                            for client in self.clients:
-                                try:
-                                    await client.send_bytes(nal_unit)
-                                except Exception:
-                                    disconnected.add(client)
-
-                            # 移除断开的客户端
-                            for client in disconnected:
-                                self.clients.discard(client)
-
-                        # 移除已处理的数据
-                        buffer = buffer[end_pos:]
+                    # 按 Scrcpy 帧头切分媒体包，每个包是完整的一帧
+                    for packet in reader.feed(data):
+                        # 按编码格式解析帧内 NAL 类型，识别关键帧和非参考帧
+                        if self._codec:
+                            self._codec.inspect(packet)
+
+                        # 更新关键帧缓存，供新客户端回放
+                        self._key_frame_cache.add(packet)
+
+                        # 放入各客户端的发送队列，每帧一条消息
+                        for client in self.clients.values():
+                            client.enqueue(packet)
 
                 except socket.error as e:
                     if e.errno == socket.EAGAIN or e.errno == socket.EWOULDBLOCK:
@@ -546,6 +657,40 @@ class VideoStreamManager:
         finally:
             logger.info("视频流转发循环已结束")
 
+    async def _send_loop(self, client: VideoClient):
+        """
+        客户端发送循环
+
+        Args:
+            client: 视频流客户端
+        """
+        try:
+            # 先回放缓存的关键帧和 GOP，再发送实时帧
+            for packet in client.replay:
+                await client.websocket.send_bytes(packet.data)
+                client.sent_frames += 1
+            client.replay = []
+
+            while True:
+                packet = await client.queue.get()
+                await client.websocket.send_bytes(packet.data)
+                client.sent_frames += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 发送失败视为客户端断开，不再接收新的帧
+            logger.debug(f"发送视频帧失败: {e}")
+            self.clients.pop(client.websocket, None)
+
+    def get_client_stats(self) -> List[dict]:
+        """
+        获取所有客户端的发送统计
+
+        Returns:
+            每个客户端的积压帧数（lag、max_lag）、已发送和已丢弃的帧数
+        """
+        return [client.get_stats() for client in self.clients.values()]
+
     async def cleanup(self):
         """清理资源"""
         await self.stop_stream()
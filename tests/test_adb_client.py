@@ -0,0 +1,228 @@
+"""Tests for ADBClient against a local fake ADB server."""
+
+import socket
+import struct
+import threading
+
+import pytest
+
+from phone_agent.adb.client import ADBClient, ADBError
+from phone_agent.adb.connection import ADBConnection
+
+SERIAL = "emulator-5554"
+FILES = {"/sdcard/hello.txt": b"hello world\n" * 10000}
+MTIME = 1700000000
+UNREACHABLE = "10.0.0.1"
+UNRESPONSIVE = "10.0.0.2"
+
+
+class FakeADBServer:
+    """
+    Minimal ADB server speaking the smart-socket protocol on a local port.
+
+    Knows one device, answers host:version and host:connect, runs shell:
+    and exec: commands from a fixed table and serves sync: STAT/RECV from
+    FILES. Every request it receives is recorded in `requests`.
+    """
+
+    COMMANDS = {
+        "echo hi": b"hi\n",
+        "screencap -p": b"\x89PNG\r\n\x1a\n\x00\r\n",
+        "echo 'a b'": b"a b\n",
+    }
+
+    def __init__(self):
+        self.requests: list[str] = []
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self.listener.getsockname()[1]
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def close(self) -> None:
+        self.listener.close()
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn: socket.socket) -> None:
+        with conn:
+            transport = False
+            while True:
+                header = _recv_exact(conn, 4)
+                if not header:
+                    return
+                request = _recv_exact(conn, int(header, 16)).decode()
+                self.requests.append(request)
+
+                if request == "host:version":
+                    conn.sendall(b"OKAY" + _prefixed(b"0029"))
+                    return
+                if request.startswith("host:connect:"):
+                    self._connect(conn, request.removeprefix("host:connect:"))
+                    return
+                if request in (f"host:transport:{SERIAL}", "host:transport-any"):
+                    conn.sendall(b"OKAY")
+                    transport = True
+                    continue
+                if request.startswith("host:transport:"):
+                    _fail(conn, f"device '{request[15:]}' not found")
+                    return
+                if not transport:
+                    _fail(conn, "no transport selected")
+                    return
+
+                service, _, command = request.partition(":")
+                if service in ("shell", "exec") and command in self.COMMANDS:
+                    conn.sendall(b"OKAY" + self.COMMANDS[command])
+                elif service == "sync":
+                    conn.sendall(b"OKAY")
+                    self._sync(conn)
+                else:
+                    _fail(conn, f"unknown service: {request}")
+                return
+
+    def _connect(self, conn: socket.socket, address: str) -> None:
+        if address.startswith(UNREACHABLE):
+            _fail(conn, f"failed to connect to {address}")
+        elif address.startswith(UNRESPONSIVE):
+            # Never answer; wait until the client gives up and disconnects
+            _recv_exact(conn, 1)
+        else:
+            conn.sendall(b"OKAY" + _prefixed(f"connected to {address}".encode()))
+
+    def _sync(self, conn: socket.socket) -> None:
+        while True:
+            header = _recv_exact(conn, 8)
+            if header[:4] in (b"", b"QUIT"):
+                return
+            tag, length = header[:4], struct.unpack("<I", header[4:])[0]
+            path = _recv_exact(conn, length).decode()
+            data = FILES.get(path)
+
+            if tag == b"STAT":
+                if data is None:
+                    stat = (0, 0, 0)
+                else:
+                    stat = (0o100644, len(data), MTIME)
+                conn.sendall(b"STAT" + struct.pack("<III", *stat))
+            elif tag == b"RECV":
+                if data is None:
+                    message = b"No such file or directory"
+                    conn.sendall(b"FAIL" + struct.pack("<I", len(message)) + message)
+                    continue
+                for offset in range(0, len(data), 65536):
+                    chunk = data[offset : offset + 65536]
+                    conn.sendall(b"DATA" + struct.pack("<I", len(chunk)) + chunk)
+                conn.sendall(b"DONE" + struct.pack("<I", 0))
+
+
+def _recv_exact(conn: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            return b""
+        data += chunk
+    return data
+
+
+def _prefixed(payload: bytes) -> bytes:
+    return b"%04x" % len(payload) + payload
+
+
+def _fail(conn: socket.socket, message: str) -> None:
+    conn.sendall(b"FAIL" + _prefixed(message.encode()))
+
+
+@pytest.fixture
+def server():
+    fake = FakeADBServer()
+    yield fake
+    fake.close()
+
+
+@pytest.fixture
+def client(server):
+    return ADBClient(port=server.port, adb_path=None, timeout=5)
+
+
+def test_host_version(client, server):
+    assert client.version() == 0x29
+    assert server.requests == ["host:version"]
+
+
+def test_shell_selects_transport_first(client, server):
+    assert client.shell(["echo", "hi"], SERIAL) == "hi\n"
+    assert server.requests == [f"host:transport:{SERIAL}", "shell:echo hi"]
+
+
+def test_shell_without_serial_uses_any_transport(client, server):
+    client.shell("echo hi")
+    assert server.requests[0] == "host:transport-any"
+
+
+def test_shell_quotes_argument_lists(client, server):
+    assert client.shell(["echo", "a b"], SERIAL) == "a b\n"
+    assert server.requests[-1] == "shell:echo 'a b'"
+
+
+def test_exec_out_is_binary_safe(client):
+    assert client.exec_out(["screencap", "-p"], SERIAL) == FakeADBServer.COMMANDS[
+        "screencap -p"
+    ]
+
+
+def test_fail_status_raises_with_message(client):
+    with pytest.raises(ADBError, match="device 'missing' not found"):
+        client.shell(["echo", "hi"], "missing")
+    with pytest.raises(ADBError, match="unknown service"):
+        client.shell(["reboot"], SERIAL)
+
+
+def test_sync_stat(client):
+    size = len(FILES["/sdcard/hello.txt"])
+    assert client.stat("/sdcard/hello.txt", SERIAL) == (0o100644, size, MTIME)
+    assert client.stat("/sdcard/missing", SERIAL) == (0, 0, 0)
+
+
+def test_sync_recv(client, server):
+    assert client.pull("/sdcard/hello.txt", SERIAL) == FILES["/sdcard/hello.txt"]
+    assert server.requests == [f"host:transport:{SERIAL}", "sync:"]
+
+
+def test_sync_recv_fail(client):
+    with pytest.raises(ADBError, match="No such file"):
+        client.pull("/sdcard/missing", SERIAL)
+
+
+def test_server_not_running():
+    listener = socket.create_server(("127.0.0.1", 0))
+    port = listener.getsockname()[1]
+    listener.close()
+    with pytest.raises(ADBError, match="not running"):
+        ADBClient(port=port, adb_path=None).version()
+
+
+def test_connection_connect(server):
+    connection = ADBConnection(client=ADBClient(port=server.port, adb_path=None))
+    assert connection.connect("192.168.1.100") == (
+        True,
+        "Connected to 192.168.1.100:5555",
+    )
+
+
+@pytest.mark.parametrize(
+    "address, error",
+    [(UNREACHABLE, "failed to connect"), (UNRESPONSIVE, "did not respond")],
+)
+def test_connection_connect_errors(server, address, error):
+    client = ADBClient(port=server.port, adb_path=None)
+    success, message = ADBConnection(client=client).connect(address, timeout=1)
+    assert not success
+    assert message.startswith("Connection failed:")
+    assert error in message
@@ -0,0 +1,104 @@
+"""Tests for context token estimates and the prefix_cache budget."""
+
+import base64
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from phone_agent.agent import PREFIX_CACHE_MAX_TOKENS, AgentConfig
+from phone_agent.context import (
+    IMAGE_TOKEN_ESTIMATE,
+    ContextPolicy,
+    compact_context,
+    estimate_image_tokens,
+    estimate_tokens,
+)
+from phone_agent.model.client import MessageBuilder
+
+SCREEN_SIZE = (1080, 2400)
+# Context window the prefix_cache budget must fit, with a 3000-token response
+CONTEXT_WINDOW = 32_768
+
+
+def encode_image(size: tuple[int, int], image_format: str = "PNG") -> str:
+    buffered = BytesIO()
+    Image.new("RGB", size, (255, 255, 255)).save(buffered, format=image_format)
+    return base64.b64encode(buffered.getvalue()).decode("ascii")
+
+
+def screenshot_turn(image_base64: str, mime_type: str = "image/png") -> list[dict]:
+    return [
+        MessageBuilder.create_user_message(
+            "** Screen Info **", image_base64=image_base64, mime_type=mime_type
+        ),
+        MessageBuilder.create_assistant_message(
+            '<think>Tap the search box.</think><answer>do(action="Tap", '
+            "element=[500, 100])</answer>"
+        ),
+    ]
+
+
+@pytest.fixture(scope="module")
+def screenshot() -> str:
+    return encode_image(SCREEN_SIZE)
+
+
+def test_image_tokens_follow_pixel_size(screenshot):
+    message = MessageBuilder.create_user_message("", image_base64=screenshot)
+    assert estimate_tokens([message]) == estimate_image_tokens(*SCREEN_SIZE) + 4
+    assert estimate_image_tokens(*SCREEN_SIZE) > 3000
+
+    small = MessageBuilder.create_user_message(
+        "", image_base64=encode_image((461, 1024), "JPEG"), mime_type="image/jpeg"
+    )
+    assert estimate_tokens([small]) == estimate_image_tokens(461, 1024) + 4
+
+
+def test_unreadable_image_uses_default_estimate():
+    message = MessageBuilder.create_user_message("", image_base64="bm90IGFuIGltYWdl")
+    assert estimate_tokens([message]) == IMAGE_TOKEN_ESTIMATE + 4
+
+
+def test_policy_image_tokens_override(screenshot):
+    message = MessageBuilder.create_user_message("", image_base64=screenshot)
+    assert estimate_tokens([message], image_tokens=100) == 104
+
+
+def test_prefix_cache_budget_fits_kept_screenshots(screenshot):
+    """Thirty kept full-resolution screenshots would overflow a 32k window."""
+    policy = AgentConfig(prefix_cache=True, lang="en").context_policy
+    assert policy.max_tokens == PREFIX_CACHE_MAX_TOKENS
+
+    messages = [
+        MessageBuilder.create_system_message("system prompt"),
+        MessageBuilder.create_user_message("task"),
+    ]
+    unbounded = list(messages)
+    for _ in range(30):
+        turn = screenshot_turn(screenshot)
+        messages += turn
+        unbounded += turn
+        # Compaction as PhoneAgent runs it with prefix_cache
+        if estimate_tokens(messages) > policy.max_tokens:
+            compact_context(messages, policy, target_tokens=policy.max_tokens // 2)
+        assert estimate_tokens(messages) <= policy.max_tokens
+        next_request = estimate_tokens(messages + screenshot_turn(screenshot)[:1])
+        assert next_request + 3000 <= CONTEXT_WINDOW
+
+    assert estimate_tokens(unbounded) > 3 * CONTEXT_WINDOW
+
+
+def test_compact_context_drops_images_by_pixel_size(screenshot):
+    messages = [MessageBuilder.create_user_message("task")]
+    for _ in range(10):
+        messages += screenshot_turn(screenshot)
+    stats = compact_context(messages, ContextPolicy(max_tokens=10_000))
+    assert stats.tokens_after <= 10_000
+    # Two full-resolution screenshots fit, a third would not
+    assert sum(message["role"] == "user" for message in messages) == 3
+
+
+def test_prefix_cache_requires_token_budget():
+    with pytest.raises(ValueError):
+        AgentConfig(prefix_cache=True, context_policy=ContextPolicy())
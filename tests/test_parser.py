@@ -0,0 +1,223 @@
+"""Property and fuzz tests for the action parser against ast.literal_eval."""
+
+import ast
+import io
+import random
+import tokenize
+import warnings
+
+import pytest
+
+from phone_agent.actions.handler import parse_action
+from phone_agent.actions.parser import parse_call, parse_calls
+from phone_agent.model.client import _parse_response
+
+CASES = 2000
+# String contents: quotes, backslashes, CJK, emoji and control characters
+ALPHABET = "ab xyz09'\"\\\n\t,()[]{}=:;中文搜索😀\x00\x7f"
+LEAF_TYPES = (str, int, float, bool, type(None))
+
+
+def random_literal(rng: random.Random, depth: int = 0):
+    """A random value made of the literals the parser accepts."""
+    kind = rng.choice(["str", "str", "int", "float", "const", "list", "tuple", "dict"])
+    if depth >= 3 and kind in ("list", "tuple", "dict"):
+        kind = "str"
+    if kind == "str":
+        return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 12)))
+    if kind == "int":
+        return rng.randint(-(10**6), 10**6)
+    if kind == "float":
+        return rng.choice([rng.uniform(-1e3, 1e3), rng.uniform(0, 1e-6), 1e20, -0.0])
+    if kind == "const":
+        return rng.choice([True, False, None])
+    items = [random_literal(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    if kind == "list":
+        return items
+    if kind == "tuple":
+        return tuple(items)
+    keys = [random_literal(rng, 3) for _ in items]
+    return dict(zip(keys, items))
+
+
+def random_call(rng: random.Random) -> str:
+    """Source text of a random do(...) or finish(...) call."""
+    if rng.random() < 0.3:
+        return f"finish(message={random_literal(rng)!r})"
+    kwargs = {f"arg{i}": random_literal(rng) for i in range(rng.randint(0, 4))}
+    if rng.random() < 0.5:
+        kwargs["element"] = [rng.randint(0, 999), rng.randint(0, 999)]
+    args = ", ".join(f"{key}={value!r}" for key, value in kwargs.items())
+    return f'do(action="Tap"{", " if args else ""}{args})'
+
+
+def mutate(rng: random.Random, text: str) -> str:
+    """Apply one to three random character edits."""
+    for _ in range(rng.randint(1, 3)):
+        pos = rng.randint(0, len(text))
+        op = rng.choice(["delete", "insert", "duplicate"])
+        if op == "delete" and pos < len(text):
+            text = text[:pos] + text[pos + 1 :]
+        elif op == "insert":
+            text = text[:pos] + rng.choice("\"'\\()[]{},:= -.0a") + text[pos:]
+        else:
+            text = text[:pos] + text[pos : pos + 2] + text[pos:]
+    return text
+
+
+def reference_parse(text: str):
+    """
+    Parse a call with ast and literal_eval, restricted to the parser's subset.
+
+    Returns:
+        (name, kwargs), or None if the text is not a call in that subset.
+    """
+    try:
+        with warnings.catch_warnings():
+            # Unknown escapes such as "\d" are kept verbatim, as in the parser
+            warnings.simplefilter("ignore")
+            node = ast.parse(text.strip(), mode="eval").body
+        if _has_adjacent_strings(text):
+            return None
+        if not (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Name)
+            and node.func.id in ("do", "finish")
+            and not node.args
+            and all(keyword.arg for keyword in node.keywords)
+        ):
+            return None
+        kwargs = {kw.arg: ast.literal_eval(kw.value) for kw in node.keywords}
+    except (SyntaxError, ValueError, TypeError, MemoryError, RecursionError):
+        return None
+    if not all(_in_subset(value) for value in kwargs.values()):
+        return None
+    return node.func.id, kwargs
+
+
+def _has_adjacent_strings(text: str) -> bool:
+    """Whether Python would implicitly concatenate string literals."""
+    tokens = [
+        token
+        for token in tokenize.generate_tokens(io.StringIO(text).readline)
+        if token.type not in (tokenize.NL, tokenize.NEWLINE, tokenize.COMMENT)
+    ]
+    return any(
+        a.type == tokenize.STRING and b.type == tokenize.STRING
+        for a, b in zip(tokens, tokens[1:])
+    )
+
+
+def _in_subset(value) -> bool:
+    """Whether a value only holds types the parser produces."""
+    if isinstance(value, (list, tuple)):
+        return all(_in_subset(item) for item in value)
+    if isinstance(value, dict):
+        return all(_in_subset(k) and _in_subset(v) for k, v in value.items())
+    return isinstance(value, LEAF_TYPES)
+
+
+def test_random_literals_match_literal_eval():
+    rng = random.Random(0)
+    for _ in range(CASES):
+        text = random_call(rng)
+        expected = reference_parse(text)
+        assert expected is not None, text
+        assert repr(parse_call(text)) == repr(expected), text
+
+
+def test_mutated_calls_match_literal_eval():
+    rng = random.Random(1)
+    for _ in range(CASES):
+        text = mutate(rng, random_call(rng))
+        expected = reference_parse(text)
+        try:
+            result = parse_call(text)
+        except ValueError:
+            # The parser may reject literals Python accepts outside its subset
+            assert expected is None, text
+            continue
+        if expected is not None:
+            assert repr(result) == repr(expected), text
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        (r'finish(message="He said \"hi\"")', 'He said "hi"'),
+        (r"finish(message='it\'s done')", "it's done"),
+        (r'finish(message="a\\"))', None),
+        ('finish(message="路径 C:\\\\tmp\\n下一行")', "路径 C:\\tmp\n下一行"),
+        ("finish(message=\"line one\nline two\")", "line one\nline two"),
+    ],
+)
+def test_finish_escaped_quotes(text, expected):
+    if expected is None:
+        with pytest.raises(ValueError):
+            parse_call(text)
+    else:
+        assert parse_call(text) == ("finish", {"message": expected})
+
+
+def test_nested_lists():
+    text = 'do(action="Swipe", start=[1, [2, [3, (4,)]]], end=[], meta={"k": [None]})'
+    assert parse_call(text) == (
+        "do",
+        {
+            "action": "Swipe",
+            "start": [1, [2, [3, (4,)]]],
+            "end": [],
+            "meta": {"k": [None]},
+        },
+    )
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        'do(action=__import__("os").system("id"))',
+        'do(action="Tap", element=open("/etc/passwd"))',
+        "do(action=x)",
+        'do("Tap")',
+        'eval("1")',
+        'do(action="Tap"',
+        'do(action="Tap", element=[1, 2)',
+        'do(action={[1]: "x"})',
+    ],
+)
+def test_rejects_non_literals(text):
+    with pytest.raises(ValueError):
+        parse_call(text)
+
+
+def test_parse_calls_splits_sequences():
+    text = 'do(action="Tap", element=[1, 2]);\ndo(action="Back")'
+    assert parse_calls(text) == [
+        ("do", {"action": "Tap", "element": [1, 2]}),
+        ("do", {"action": "Back"}),
+    ]
+
+
+def test_parse_action_finish_with_unescaped_quotes():
+    action = parse_action('finish(message="Found "Cafe" nearby")')
+    assert action == {"_metadata": "finish", "message": 'Found "Cafe" nearby'}
+
+
+def test_parse_action_closed_answer_block():
+    content = (
+        "<think>Type the message and send it.</think>\n<answer>\n"
+        'do(action="Tap", element=[500, 900])\n'
+        'do(action="Type", text="Hello World")\n'
+        'do(action="Tap", element=[900, 900])\n'
+        "</answer>"
+    )
+    thinking, action_text = _parse_response(content)
+    assert not action_text.endswith("</answer>")
+    action = parse_action(action_text)
+    assert action["_metadata"] == "batch"
+    assert [a["action"] for a in action["actions"]] == ["Tap", "Type", "Tap"]
+    assert parse_action('do(action="Back")</answer>') == {
+        "_metadata": "do",
+        "action": "Back",
+    }
+    assert parse_action('finish(message="done")\n</answer>')["message"] == "done"
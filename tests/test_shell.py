@@ -0,0 +1,151 @@
+"""Tests for persistent shell sessions against a fake device shell."""
+
+import re
+import socket
+import threading
+
+import pytest
+
+from phone_agent.adb import shell
+from phone_agent.adb.shell import ShellSession, ShellSessionError, ShellSessionPool
+
+# Line ShellSession.run writes: "<command> </dev/null 2>&1; echo <marker>$?"
+COMMAND_PATTERN = re.compile(r"(.*) </dev/null 2>&1; echo (\S+)\$\?\n")
+
+
+class FakeDevice:
+    """
+    Device end of a shell socket.
+
+    Answers each framed command from OUTPUTS with its output, then the
+    marker and exit status. "sleep 60" never answers and "exit" closes the
+    shell. Every command received is recorded in `commands`.
+    """
+
+    OUTPUTS = {
+        "echo hi": ("hi\n", 0),
+        "printf abc": ("abc", 0),
+        "ls /missing": ("ls: /missing: No such file or directory\n", 1),
+        "echo 'a b'": ("a b\n", 0),
+    }
+
+    def __init__(self, alive: bool = True):
+        self.commands: list[str] = []
+        self.host, self.device = socket.socketpair()
+        if alive:
+            threading.Thread(target=self._serve, daemon=True).start()
+        else:
+            self.device.close()
+
+    def _serve(self) -> None:
+        with self.device, self.device.makefile("r", encoding="utf-8") as lines:
+            for line in lines:
+                command, marker = COMMAND_PATTERN.fullmatch(line).groups()
+                self.commands.append(command)
+                if command == "exit":
+                    return
+                if command == "sleep 60":
+                    continue
+                output, status = self.OUTPUTS[command]
+                self.device.sendall(f"{output}{marker}{status}\n".encode())
+
+
+class FakeClient:
+    """ADBClient stand-in that opens shells on FakeDevice instances."""
+
+    def __init__(self, alive: bool = True):
+        self.alive = alive
+        self.devices: list[FakeDevice] = []
+
+    def open_shell(self, device_id: str | None = None) -> socket.socket:
+        device = FakeDevice(self.alive)
+        self.devices.append(device)
+        return device.host
+
+    def shell(self, args, device_id=None, timeout=10) -> str:
+        return "fallback\n"
+
+
+@pytest.fixture
+def session():
+    session = ShellSession(client=FakeClient())
+    yield session
+    session.close()
+
+
+def test_output_and_exit_status(session):
+    assert session.run(["echo", "hi"]) == (0, "hi\n")
+    assert session.run(["ls", "/missing"]) == (
+        1,
+        "ls: /missing: No such file or directory\n",
+    )
+
+
+def test_output_without_trailing_newline(session):
+    assert session.run(["printf", "abc"]) == (0, "abc")
+    # The next command's framing is unaffected
+    assert session.run(["echo", "hi"]) == (0, "hi\n")
+
+
+def test_arguments_are_quoted(session):
+    assert session.run(["echo", "a b"]) == (0, "a b\n")
+
+
+def test_timeout_marks_command_sent(session):
+    with pytest.raises(ShellSessionError, match="timed out") as info:
+        session.run(["sleep", "60"], timeout=0.2)
+    assert info.value.command_sent
+
+
+def test_exited_session_marks_command_sent(session):
+    with pytest.raises(ShellSessionError, match="exited") as info:
+        session.run(["exit"])
+    assert info.value.command_sent
+    assert not session.alive
+
+
+def test_pool_reuses_sessions():
+    client = FakeClient()
+    pool = ShellSessionPool(client=client)
+    assert pool.run(["echo", "hi"]) == (0, "hi\n")
+    assert pool.run(["printf", "abc"]) == (0, "abc")
+    assert len(client.devices) == 1
+    pool.close()
+
+
+@pytest.mark.parametrize("error", [RuntimeError, KeyboardInterrupt])
+def test_pool_closes_session_on_caller_error(error):
+    pool = ShellSessionPool(client=FakeClient())
+    with pytest.raises(error):
+        with pool.session() as session:
+            raise error()
+    # Closed rather than returned to the pool, so its reader thread ends
+    session._reader.join(5)
+    assert not session._reader.is_alive()
+    assert pool._idle.get(None, []) == []
+    pool.close()
+
+
+def test_dead_session_falls_back(monkeypatch):
+    client = FakeClient(alive=False)
+    pool = ShellSessionPool(client=client)
+
+    def open_dead(device_id):
+        dead = ShellSession(device_id, client=client)
+        dead._eof.wait(5)
+        return dead
+
+    monkeypatch.setattr(pool, "_open", open_dead)
+    monkeypatch.setattr(shell, "_pool", pool)
+    monkeypatch.setattr(shell, "get_client", lambda: FakeClient())
+    assert shell.run_shell(["echo", "hi"]) == "fallback\n"
+    assert pool._idle.get(None, []) == []
+
+
+def test_sent_command_is_not_rerun(monkeypatch):
+    pool = ShellSessionPool(client=FakeClient())
+    monkeypatch.setattr(shell, "_pool", pool)
+    monkeypatch.setattr(shell, "get_client", lambda: FakeClient())
+    with pytest.raises(ShellSessionError) as info:
+        shell.run_shell(["sleep", "60"], timeout=0.2)
+    assert info.value.command_sent